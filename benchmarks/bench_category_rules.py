@@ -0,0 +1,51 @@
+"""
+Times CategoryRules.categorize over a million synthetic file names.
+
+    python benchmarks/bench_category_rules.py [--names 1000000] [--budget 1.0]
+
+Exits with status 1 if categorizing takes longer than the budget (in seconds).
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.backend.category_rules import get_rules
+
+EXTENSIONS = ["pdf", "PDF", "docx", "mp4", "mov", "mp3", "jpg", "png", "txt", "csv", "html", "zip", "tar.gz",
+              "tar.xz", "bin", "", "json", "py", "iso", "heic"]
+
+
+def make_names(count, seed=0):
+    rng = random.Random(seed)
+    names = []
+    for i in range(count):
+        extension = rng.choice(EXTENSIONS)
+        stem = f"file_{i}_{rng.randrange(1 << 20):x}"
+        names.append(f"{stem}.{extension}" if extension else stem)
+    return names
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--names", type=int, default=1_000_000)
+    parser.add_argument("--budget", type=float, default=1.0, help="Maximum seconds allowed")
+    args = parser.parse_args(argv)
+
+    names = make_names(args.names)
+    categorize = get_rules().categorize
+
+    start = time.perf_counter()
+    for name in names:
+        categorize(name)
+    seconds = time.perf_counter() - start
+
+    print(f"categorized {len(names)} names in {seconds:.3f}s ({len(names) / seconds:,.0f} names/s)")
+    return 0 if seconds <= args.budget else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,179 @@
+"""
+Times Smart Sort's hot paths on synthetic trees at several scales and compares them with a stored baseline.
+
+    python benchmarks/run_benchmarks.py [--scales 1000,10000,100000] [--output results.json]
+                                        [--baseline benchmarks/baseline.json] [--save-baseline] [--tolerance 0.5]
+
+Every scale runs in a fresh temporary directory, which is also the working directory, so the DBs (created
+relative to it) never touch the real ones. Results are printed as JSON (or written to --output) together
+with each benchmark's ratio to the baseline. Exits with status 1 if anything is slower than its baseline
+by more than the tolerance.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic_tree import generate_tree
+
+DEFAULT_SCALES = [1000, 10000, 100000]
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_TOLERANCE = 0.5
+
+SEARCH_QUERIES = ["report", "file_00", "invoice", "img", ".pdf", "screenshot", "notes", "setup", "zzz", "1"]
+POINT_LOOKUPS = 1000
+
+
+def timed(results, name, scale, items, function, *args):
+    """Runs function(*args) with its progress messages silenced and records the timing."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        value = function(*args)
+        seconds = time.perf_counter() - start
+    results[f"{name}@{scale}"] = {"benchmark": name, "scale": scale, "items": items, "seconds": seconds,
+                                  "per_second": items / seconds if seconds else None}
+    print(f"  {name:<36} {seconds:8.3f}s  {items / seconds if seconds else 0:>12,.0f}/s", file=sys.stderr)
+    return value
+
+
+def run_scale(scale, workdir, results):
+    from src.backend.file_categorizer import categorize_file
+    from src.backend.file_index import build_index
+    from src.backend.file_search import search_files
+    from src.backend.folder_categorizer import move_files_to_category_folder
+    from src.io import processed_data
+    from src.io.extract_data import extract_many, extractData
+    from src.io.manual_organization_script import Organize
+
+    processed_data.close_database_connection()
+    os.chdir(workdir)
+    print(f"{scale} files:", file=sys.stderr)
+
+    tree = os.path.join(workdir, "tree")
+    paths = generate_tree(tree, scale, depth=3, seed=scale)
+
+    timed(results, "categorize_file", scale, len(paths), lambda: [categorize_file(path) for path in paths])
+    timed(results, "extractData", scale, len(paths), lambda: [extractData(path) for path in paths])
+    directories = sorted({os.path.dirname(path) for path in paths})
+    timed(results, "extract_many", scale, len(paths), lambda: [extract_many(directory) for directory in directories])
+
+    rows = [(path, os.path.splitext(path)[1][1:], categorize_file(path), "blue") for path in paths]
+    timed(results, "processed_data.add_files", scale, len(rows), processed_data.add_files, rows)
+    timed(results, "processed_data.lookup_many", scale, len(paths), processed_data.lookup_many, paths)
+    sample = random.Random(scale).sample(paths, min(POINT_LOOKUPS, len(paths)))
+    timed(results, "processed_data.lookup_file_by_path", scale, len(sample),
+          lambda: [processed_data.lookup_file_by_path(path) for path in sample])
+
+    timed(results, "build_index", scale, len(paths), build_index, tree)
+    timed(results, "search_files", scale, len(SEARCH_QUERIES),
+          lambda: [sum(1 for _ in search_files(query)) for query in SEARCH_QUERIES])
+
+    # Organize and the journaled mover work on a single folder, so they get flat trees of their own
+    flat = os.path.join(workdir, "organize")
+    flat_paths = generate_tree(flat, scale, depth=0, seed=scale + 1)
+    timed(results, "Organize.organize_files", scale, len(flat_paths), Organize, flat)
+
+    incoming = os.path.join(workdir, "incoming")
+    incoming_paths = generate_tree(incoming, scale, depth=0, collisions=0.3, seed=scale + 2)
+    destination = os.path.join(workdir, "sorted")
+    # Half the names are already taken at the destination, so the collision renaming is exercised too
+    generate_tree(destination, scale // 2, depth=0, collisions=0.3, seed=scale + 2)
+    timed(results, "move_files_to_category_folder", scale, len(incoming_paths),
+          move_files_to_category_folder, incoming_paths, destination)
+
+    processed_data.close_database_connection()
+
+
+def compare(results, baseline, tolerance):
+    """Adds baseline_seconds, ratio and status to every result that has a baseline. Returns the regressions."""
+    regressions = []
+    for key, result in results.items():
+        reference = baseline.get(key)
+        if not reference or not reference.get("seconds"):
+            result["status"] = "new"
+            continue
+        ratio = result["seconds"] / reference["seconds"]
+        result["baseline_seconds"] = reference["seconds"]
+        result["ratio"] = ratio
+        if ratio > 1 + tolerance:
+            result["status"] = "regression"
+            regressions.append(key)
+        elif ratio < 1 / (1 + tolerance):
+            result["status"] = "improvement"
+        else:
+            result["status"] = "ok"
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", default=",".join(map(str, DEFAULT_SCALES)),
+                        help="Comma-separated file counts")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed slowdown as a fraction of the baseline time")
+    args = parser.parse_args(argv)
+    scales = [int(scale) for scale in args.scales.split(",") if scale]
+
+    results = {}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="smartsort-bench-") as tmp:
+        # Keep the user's category rules and settings out of the numbers
+        os.environ["SMARTSORT_CONFIG_DIR"] = os.path.join(tmp, "config")
+        try:
+            for scale in scales:
+                workdir = os.path.join(tmp, str(scale))
+                os.makedirs(workdir)
+                run_scale(scale, workdir, results)
+                os.chdir(tmp)
+                shutil.rmtree(workdir)
+        finally:
+            os.chdir(cwd)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f).get("results", {})
+    regressions = compare(results, baseline, args.tolerance)
+
+    report = {
+        "meta": {"python": platform.python_version(), "platform": platform.platform(),
+                 "machine": platform.machine(), "cpus": os.cpu_count(), "time": time.time(),
+                 "baseline": args.baseline if baseline else None, "tolerance": args.tolerance},
+        "results": results,
+        "regressions": regressions,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+    if args.save_baseline:
+        stored = {key: {field: result[field] for field in ("benchmark", "scale", "items", "seconds", "per_second")}
+                  for key, result in results.items()}
+        merged = dict(baseline, **stored)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"meta": report["meta"], "results": dict(sorted(merged.items()))}, f, indent=2)
+            f.write("\n")
+
+    for key in regressions:
+        result = results[key]
+        print(f"REGRESSION {key}: {result['seconds']:.3f}s vs {result['baseline_seconds']:.3f}s "
+              f"({result['ratio']:.2f}x)", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
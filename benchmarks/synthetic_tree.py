@@ -0,0 +1,117 @@
+"""
+Generates synthetic directory trees for the benchmarks.
+
+    python benchmarks/synthetic_tree.py ROOT [--files 10000] [--depth 3] [--collisions 0.1] [--seed 0]
+
+File counts, nesting depth, the extension mix, the share of colliding names ("report.pdf",
+"report (1).pdf", ...) and the size distribution are all configurable; the same seed gives the same tree.
+"""
+import argparse
+import os
+import random
+
+# Extension -> relative weight; "" is a file without an extension
+DEFAULT_EXTENSION_MIX = {
+    "pdf": 12, "docx": 6, "txt": 10, "csv": 4, "json": 4, "py": 4, "html": 3,
+    "jpg": 14, "png": 8, "heic": 2, "mp4": 5, "mov": 2, "mp3": 5,
+    "zip": 4, "tar.gz": 2, "exe": 2, "bin": 3, "": 4,
+}
+
+# Real magic numbers, so content sniffing has something to find
+MAGIC = {
+    "pdf": b"%PDF-1.7\n",
+    "png": b"\x89PNG\r\n\x1a\n",
+    "jpg": b"\xff\xd8\xff\xe0",
+    "zip": b"PK\x03\x04",
+    "exe": b"MZ",
+    "mp3": b"ID3\x03",
+}
+
+COLLIDING_STEMS = ["report", "invoice", "IMG_0001", "setup", "notes", "Screenshot 2024-01-01", "download"]
+
+# Sizes are log-normal around the median, capped so huge trees stay quick to write
+DEFAULT_MEDIAN_SIZE = 2048
+DEFAULT_MAX_SIZE = 256 * 1024
+
+_FILLER = random.Random(0).randbytes(DEFAULT_MAX_SIZE)
+
+
+def make_directories(root, count, depth, rng):
+    """Creates up to count directories nested at most depth levels below root and returns all of them."""
+    directories = [root]
+    parents = [(root, 0)]  # directories that can still take a subdirectory, with their level
+    for i in range(count):
+        parent, level = rng.choice(parents)
+        path = os.path.join(parent, f"dir_{i}")
+        os.makedirs(path, exist_ok=True)
+        directories.append(path)
+        if level + 1 < depth:
+            parents.append((path, level + 1))
+    return directories
+
+
+def generate_tree(root, files=10000, depth=3, directories=None, extension_mix=None, collisions=0.1,
+                  median_size=DEFAULT_MEDIAN_SIZE, max_size=DEFAULT_MAX_SIZE, seed=0):
+    """
+    Writes files files under root and returns their paths. depth=0 puts everything directly in root;
+    otherwise they are spread over directories folders (default files / 100) at most depth levels deep.
+    A collisions share of the files reuse a handful of common stems with " (N)" copies, as downloads do;
+    copies of a stem also share its content, so they are real duplicates.
+    """
+    rng = random.Random(seed)
+    os.makedirs(root, exist_ok=True)
+    extension_mix = extension_mix or DEFAULT_EXTENSION_MIX
+    extensions = list(extension_mix)
+    weights = list(extension_mix.values())
+
+    folders = [root]
+    if depth > 0:
+        folders = make_directories(root, directories or max(1, files // 100), depth, rng)
+
+    paths = []
+    copies = {}
+    contents = {}  # (stem, extension) -> (size, offset), so colliding names are also duplicate content
+    for i in range(files):
+        folder = rng.choice(folders)
+        extension = rng.choices(extensions, weights)[0]
+        size = min(max_size, int(rng.lognormvariate(0, 1.2) * median_size))
+        offset = rng.randrange(len(_FILLER) - size + 1)
+        if rng.random() < collisions:
+            stem = rng.choice(COLLIDING_STEMS)
+            size, offset = contents.setdefault((stem, extension), (size, offset))
+            copy = copies.get((folder, stem, extension), 0)
+            copies[(folder, stem, extension)] = copy + 1
+            if copy:
+                stem = f"{stem} ({copy})"
+        else:
+            stem = f"file_{i:07d}"
+        name = f"{stem}.{extension}" if extension else stem
+
+        path = os.path.join(folder, name)
+        with open(path, "wb") as f:
+            magic = MAGIC.get(extension, b"")
+            f.write(magic + _FILLER[offset:offset + max(0, size - len(magic))])
+        paths.append(path)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("root")
+    parser.add_argument("--files", type=int, default=10000)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--directories", type=int)
+    parser.add_argument("--collisions", type=float, default=0.1)
+    parser.add_argument("--median-size", type=int, default=DEFAULT_MEDIAN_SIZE)
+    parser.add_argument("--max-size", type=int, default=DEFAULT_MAX_SIZE)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    paths = generate_tree(args.root, args.files, args.depth, args.directories, None, args.collisions,
+                          args.median_size, args.max_size, args.seed)
+    print(f"wrote {len(paths)} files under {args.root}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
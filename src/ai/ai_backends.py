@@ -0,0 +1,121 @@
+import json
+import os
+
+# Which chat backend categorize_with_ai talks to: "openai" (default), "http" (urllib client for
+# SMARTSORT_AI_BASE_URL) or "fake" for offline runs and tests
+BACKEND_ENV_VAR = "SMARTSORT_AI_BACKEND"
+BASE_URL_ENV_VAR = "SMARTSORT_AI_BASE_URL"
+
+
+class ChatBackend:
+    """Sends a chat conversation to a model and returns the text of its reply."""
+
+    def complete(self, messages, max_tokens=None):
+        raise NotImplementedError
+
+
+class OpenAIChatBackend(ChatBackend):
+    """
+    Chat completions through the openai client. base_url points it at any OpenAI-compatible server,
+    such as a local stub server in CI; when omitted the client reads OPENAI_BASE_URL / OPENAI_API_KEY itself.
+    """
+
+    def __init__(self, model="gpt-4", base_url=None, api_key=None, timeout=None):
+        self.model = model
+        self.base_url = base_url
+        self.api_key = api_key
+        self.timeout = timeout
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            import openai
+            self._client = openai.OpenAI(base_url=self.base_url, api_key=self.api_key, timeout=self.timeout)
+        return self._client
+
+    def complete(self, messages, max_tokens=None):
+        response = self.client.chat.completions.create(model=self.model, messages=messages, max_tokens=max_tokens)
+        return response.choices[0].message.content.strip()
+
+
+class BackendHTTPError(Exception):
+    """An HTTP error from a model server; status_code matches what the openai client's errors carry."""
+
+    def __init__(self, status_code, message=""):
+        super().__init__(f"HTTP {status_code}: {message}")
+        self.status_code = status_code
+
+
+class HTTPChatBackend(ChatBackend):
+    """
+    Minimal OpenAI-compatible chat client on urllib, for servers (or a local mock server)
+    where installing the openai package isn't wanted.
+    """
+
+    def __init__(self, base_url, model="gpt-4", api_key=None, timeout=60):
+        self.url = base_url.rstrip("/") + "/chat/completions"
+        self.model = model
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY", "")
+        self.timeout = timeout
+
+    def complete(self, messages, max_tokens=None):
+        import urllib.error
+        import urllib.request
+
+        body = {"model": self.model, "messages": messages}
+        if max_tokens is not None:
+            body["max_tokens"] = max_tokens
+        request = urllib.request.Request(self.url, data=json.dumps(body).encode("utf-8"), headers={
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}",
+        })
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                reply = json.load(response)
+        except urllib.error.HTTPError as e:
+            raise BackendHTTPError(e.code, e.reason) from e
+        return reply["choices"][0]["message"]["content"].strip()
+
+
+class FakeChatBackend(ChatBackend):
+    """
+    In-process stand-in for the model. It answers the batch prompt from categorize_many_with_ai with a JSON
+    object built by answer(file_name), which defaults to the extension rules. calls records every request.
+    """
+
+    def __init__(self, answer=None):
+        if answer is None:
+            from src.backend.file_categorizer import categorize_file
+            answer = categorize_file
+        self.answer = answer
+        self.calls = []
+
+    def complete(self, messages, max_tokens=None):
+        self.calls.append(messages)
+        prompt = messages[-1]["content"]
+        file_names = json.loads(prompt[prompt.index("["):prompt.rindex("]") + 1])
+        return json.dumps({file_name: self.answer(file_name) for file_name in file_names})
+
+
+_backend = None
+
+
+def get_chat_backend():
+    """Returns the configured chat backend, creating it on first use."""
+    global _backend
+    if _backend is None:
+        name = os.environ.get(BACKEND_ENV_VAR, "openai")
+        if name == "fake":
+            _backend = FakeChatBackend()
+        elif name == "http":
+            _backend = HTTPChatBackend(os.environ.get(BASE_URL_ENV_VAR, "http://127.0.0.1:8000/v1"))
+        else:
+            _backend = OpenAIChatBackend(base_url=os.environ.get(BASE_URL_ENV_VAR))
+    return _backend
+
+
+def set_chat_backend(backend):
+    """Replaces the chat backend, e.g. with a FakeChatBackend in tests."""
+    global _backend
+    _backend = backend
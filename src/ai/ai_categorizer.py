@@ -1,26 +1,117 @@
-import openai
+import json
+import re
 
-def categorize_with_ai(file_name):
+from src.ai.ai_backends import get_chat_backend
+from src.io.processed_data import lookup_ai_categories, store_ai_categories, evict_ai_categories
+
+# Bump when the prompt changes so answers to the old prompt are no longer served from the cache
+PROMPT_VERSION = "2"
+
+# File names sent to the model per request
+BATCH_SIZE = 50
+
+# Cached answers expire after 30 days; beyond CACHE_MAX_ENTRIES the least recently used are dropped
+CACHE_TTL = 30 * 24 * 60 * 60
+CACHE_MAX_ENTRIES = 50000
+
+SYSTEM_PROMPT = "You are a file categorization assistant. Given file names, suggest a short folder name for each."
+
+
+def normalize_file_name(file_name):
     """
-    Uses GPT-4 to categorize the file based on its title.
+    Reduces a file name to what the model's answer depends on, so near-identical names share a cache entry:
+    "Report (2).PDF", "report_2.pdf" and "report-17.pdf" all become "report #.pdf".
     """
+    stem, dot, extension = file_name.lower().strip().rpartition(".")
+    if not dot:
+        stem, extension = extension, ""
+    stem = re.sub(r"\d+", "#", stem)
+    stem = " ".join(re.findall(r"[^\W_]+|#", stem))
+    return f"{stem}.{extension}" if dot else stem
+
+
+def cache_key(file_name):
+    return f"{PROMPT_VERSION}:{normalize_file_name(file_name)}"
+
+
+def build_batch_prompt(file_names):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": "Suggest a folder name for each of these files. Answer only with a JSON object "
+                                    "mapping every file name to its folder name.\n" + json.dumps(file_names)},
+    ]
+
+
+def parse_batch_answer(answer, file_names):
+    """Returns {file_name: category} for the names the model answered; malformed answers give {}."""
     try:
-        print(f"Feeding title '{file_name}' into GPT-4 for categorization...")
-        
-        # Use the correct chat completion endpoint with GPT-4
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are an AI that categorizes files based on their names."},
-                {"role": "user", "content": f"Categorize the file with the title '{file_name}'. Suggest a folder name based on the title."}
-            ],
-            max_tokens=10
-        )
-
-        ai_category = response['choices'][0]['message']['content'].strip()
-        print(f"AI categorized {file_name} as: {ai_category}")
-        return ai_category
-    
-    except Exception as e:
-        print(f"Error categorizing with GPT-4: {e}")
-        return "Others"
\ No newline at end of file
+        parsed = json.loads(answer[answer.index("{"):answer.rindex("}") + 1])
+    except ValueError:
+        print(f"Could not parse AI answer: {answer[:200]}")
+        return {}
+    if not isinstance(parsed, dict):
+        return {}
+    return {name: str(parsed[name]).strip() for name in file_names if parsed.get(name)}
+
+
+def lookup_cached_answers(file_names):
+    """
+    First half of a cached categorization: returns (keys, cached, uncached) where keys is {file_name: cache key},
+    cached is {cache key: category} for the answers still in the cache and uncached lists one representative
+    name per key the model still has to be asked about.
+    """
+    keys = {file_name: cache_key(file_name) for file_name in file_names}
+    cached = lookup_ai_categories(set(keys.values()), max_age=CACHE_TTL)
+
+    # One representative name per uncached key is enough to ask about
+    representatives = {}
+    for file_name, key in keys.items():
+        if key not in cached:
+            representatives.setdefault(key, file_name)
+    return keys, cached, list(representatives.values())
+
+
+def store_answers(keys, cached, answered):
+    """
+    Second half: caches the model's {file_name: category} answers, evicts old entries and returns
+    {file_name: category} for every name in keys, with "Others" for anything that wasn't answered.
+    """
+    new_entries = {keys[file_name]: category for file_name, category in answered.items()}
+    if new_entries:
+        store_ai_categories(new_entries)
+        evict_ai_categories(max_age=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES)
+    cached.update(new_entries)
+    return {file_name: cached.get(key, "Others") for file_name, key in keys.items()}
+
+
+def categorize_many_with_ai(file_names, backend=None, batch_size=BATCH_SIZE):
+    """
+    Categorizes many files by title. Answers are cached in the DB by normalized name and prompt version;
+    names not in the cache are sent to the model batch_size at a time.
+    Returns {file_name: category}, with "Others" for anything the model couldn't answer.
+    """
+    keys, cached, uncached = lookup_cached_answers(file_names)
+
+    answered = {}
+    if uncached:
+        backend = backend or get_chat_backend()
+        for start in range(0, len(uncached), batch_size):
+            batch = uncached[start:start + batch_size]
+            print(f"Feeding {len(batch)} titles into the AI for categorization...")
+            try:
+                answer = backend.complete(build_batch_prompt(batch))
+            except Exception as e:
+                print(f"Error categorizing with AI: {e}")
+                continue
+            answered.update(parse_batch_answer(answer, batch))
+
+    return store_answers(keys, cached, answered)
+
+
+def categorize_with_ai(file_name, backend=None):
+    """
+    Uses the AI model to categorize the file based on its title.
+    """
+    category = categorize_many_with_ai([file_name], backend)[file_name]
+    print(f"AI categorized {file_name} as: {category}")
+    return category
@@ -0,0 +1,179 @@
+import asyncio
+import random
+import time
+import urllib.error
+
+from src.ai.ai_backends import get_chat_backend
+from src.ai.ai_categorizer import (BATCH_SIZE, build_batch_prompt, lookup_cached_answers, parse_batch_answer,
+                                   store_answers)
+from src.backend.category_rules import get_rules
+
+# Requests in flight at once
+DEFAULT_CONCURRENCY = 8
+
+# Token bucket: sustained requests per second and the burst allowed on top of it
+DEFAULT_RATE = 5.0
+DEFAULT_BURST = 10
+
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_RETRIES = 5
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Async token bucket: acquire() waits until a token is available, refilling at rate tokens per second."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def get_status_code(error):
+    """The HTTP status of an error from the openai client, HTTPChatBackend or urllib, if it has one."""
+    for source in (error, getattr(error, "response", None)):
+        status = getattr(source, "status_code", None) or getattr(source, "code", None)
+        if isinstance(status, int):
+            return status
+    return None
+
+
+def is_retryable(error):
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    status = get_status_code(error)
+    if status is None:
+        # Refused or reset connections from urllib (HTTPChatBackend) carry no status
+        return isinstance(error, urllib.error.URLError)
+    return status in RETRYABLE_STATUS_CODES or status >= 500
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, maximum=BACKOFF_MAX):
+    """Full-jitter exponential backoff: a random delay up to base * 2 ** attempt, capped at maximum."""
+    return random.uniform(0, min(maximum, base * 2 ** attempt))
+
+
+class RequestLimiter:
+    """Caps concurrency, enforces the rate limit and retries failed calls with jittered backoff."""
+
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, rate=DEFAULT_RATE, burst=DEFAULT_BURST,
+                 timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.bucket = TokenBucket(rate, burst)
+        self.timeout = timeout
+        self.retries = retries
+
+    async def call(self, function, *args):
+        """
+        Runs the blocking function(*args) on a worker thread under the limits and returns its result.
+        A call that times out keeps its concurrency slot until its thread actually finishes, since the
+        thread can't be cancelled; otherwise timed out calls would push the real concurrency over the cap.
+        """
+        attempt = 0
+        while True:
+            await self.semaphore.acquire()
+            try:
+                await self.bucket.acquire()
+                task = asyncio.ensure_future(asyncio.to_thread(function, *args))
+            except BaseException:
+                self.semaphore.release()
+                raise
+            task.add_done_callback(self._release)
+            try:
+                return await asyncio.wait_for(asyncio.shield(task), self.timeout)
+            except Exception as e:
+                if attempt >= self.retries or not is_retryable(e):
+                    raise
+                error = e
+            delay = backoff_delay(attempt)
+            print(f"Retrying AI request in {delay:.1f}s after: {error}")
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def _release(self, task):
+        self.semaphore.release()
+        if not task.cancelled():
+            # Mark the error as seen; after a timeout nobody awaits the task any more
+            task.exception()
+
+
+async def categorize_files_async(file_names, backend=None, batch_size=BATCH_SIZE, use_rules=True, **limits):
+    """
+    Categorizes file names concurrently. Names the extension rules can place (when use_rules is set) and names
+    with a cached AI answer never reach the network; the rest are sent in batches through a RequestLimiter.
+    limits are passed to RequestLimiter (concurrency, rate, burst, timeout, retries).
+    Returns {file_name: category}, with "Others" for anything that couldn't be answered.
+    """
+    file_names = list(file_names)
+    results = {}
+
+    if use_rules:
+        rules = get_rules()
+        for file_name in file_names:
+            category = rules.categorize(file_name)
+            if category != rules.default_category:
+                results[file_name] = category
+
+    keys, cached, uncached = await asyncio.to_thread(
+        lookup_cached_answers, [file_name for file_name in file_names if file_name not in results])
+
+    answered = {}
+    if uncached:
+        backend = backend or get_chat_backend()
+        limiter = RequestLimiter(**limits)
+        batches = [uncached[i:i + batch_size] for i in range(0, len(uncached), batch_size)]
+
+        async def run_batch(batch):
+            try:
+                answer = await limiter.call(backend.complete, build_batch_prompt(batch))
+            except Exception as e:
+                print(f"Error categorizing with AI: {e}")
+                return {}
+            return parse_batch_answer(answer, batch)
+
+        for batch_answer in await asyncio.gather(*(run_batch(batch) for batch in batches)):
+            answered.update(batch_answer)
+
+    results.update(await asyncio.to_thread(store_answers, keys, cached, answered))
+    return results
+
+
+async def embed_documents_async(texts, embed=None, **limits):
+    """
+    Embeds many texts concurrently through a RequestLimiter. embed defaults to
+    classifier_ai.get_document_embedding. Returns the embeddings in order, None where a request failed.
+    """
+    if embed is None:
+        from src.ai.classifier_ai import get_document_embedding
+        embed = get_document_embedding
+    limiter = RequestLimiter(**limits)
+
+    async def run(text):
+        try:
+            return await limiter.call(embed, text)
+        except Exception as e:
+            print(f"Error generating embedding: {e}")
+            return None
+
+    return await asyncio.gather(*(run(text) for text in texts))
+
+
+def categorize_files(file_names, **kwargs):
+    """Blocking wrapper around categorize_files_async for callers without an event loop."""
+    return asyncio.run(categorize_files_async(file_names, **kwargs))
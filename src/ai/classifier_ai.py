@@ -1,72 +1,155 @@
-import openai
-from sklearn.cluster import KMeans
 import numpy as np
 
-# Global lists to hold document embeddings and contents
-document_embeddings = []
-document_contents = []
+from src.ai.embedding_backends import get_embedding_backend
+from src.ai.incremental_clustering import IncrementalClusterer
+from src.ai.keyword_index import KeywordIndex
+from src.ai.text_extraction import extract_text
+from src.ai.vector_store import VectorStore
+from src.backend.settings import load_json_config
+
+# Cluster count from ~/.smartsort/settings.json ("cluster_count"); missing or null picks it automatically
+CLUSTER_COUNT = (load_json_config("settings.json") or {}).get("cluster_count")
+
+# Cluster naming indexes the start of each document
+SNIPPET_CHARS = 2000
+
+# Chunks sent per embedding request
+EMBEDDING_BATCH_SIZE = 64
+
+clusterer = IncrementalClusterer(n_clusters=CLUSTER_COUNT)
+keyword_index = KeywordIndex()  # rows line up with the clusterer's
+cluster_names = {}
+last_cluster = None
+_vector_store = None
+
+def get_vector_store():
+    """The on-disk embedding store of the current embedding backend, reopened when the backend changes."""
+    global _vector_store
+    name = get_embedding_backend().name
+    if _vector_store is None or _vector_store.store != name:
+        _vector_store = VectorStore(name)
+    return _vector_store
+
+# Open the persisted store up front so files embedded in earlier runs are neighbours from the first file on
+try:
+    get_vector_store()
+except Exception as e:
+    print(f"Error loading the vector store: {e}")
 
 def get_document_embedding(text):
-    response = openai.Embedding.create(
-        input=text,
-        model="text-embedding-ada-002"  # Example model
-    )
-    return response['data'][0]['embedding']
+    return get_embedding_backend().embed([text])[0]
 
-# AI-based classification function
-def classify_and_categorize_file(file_path):
-    print(f"Classifying file: {file_path}")
-    
-    # Read the file content
-    try:
-        with open(file_path, 'r') as f:
-            content = f.read()
-
-        # Get the embedding for the document
-        embedding = get_document_embedding(content)
-        if embedding:
-            document_embeddings.append(embedding)
-            document_contents.append(content)
-        else:
-            print(f"Error generating embedding for file: {file_path}")
-            return "Others", f"/Users/gagankarnati/Others"
+def get_document_embeddings(texts):
+    """Embeds many texts, EMBEDDING_BATCH_SIZE per request, in order."""
+    backend = get_embedding_backend()
+    return np.concatenate([np.asarray(backend.embed(texts[start:start + EMBEDDING_BATCH_SIZE]), dtype=np.float32)
+                           for start in range(0, len(texts), EMBEDDING_BATCH_SIZE)])
+
+def embed_documents(documents):
+    """
+    Embeds the chunks of many documents together and mean-pools each document's chunks into one
+    unit-length vector. documents is a list of chunk lists; returns an array with one row per document.
+    """
+    chunks = [chunk for document in documents for chunk in document]
+    owners = np.repeat(np.arange(len(documents)), [len(document) for document in documents])
+    vectors = get_document_embeddings(chunks)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    pooled = np.zeros((len(documents), vectors.shape[1]), dtype=np.float32)
+    np.add.at(pooled, owners, vectors / np.where(norms == 0, 1, norms))
+    norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+    return pooled / np.where(norms == 0, 1, norms)
+
+def embed_chunks(chunks):
+    return embed_documents([chunks])[0]
 
-        # Perform clustering only if there are enough documents
-        if len(document_embeddings) >= 3:
-            category = cluster_documents()
+def classify_and_categorize_files(file_paths):
+    """
+    Classifies many files at once: text is extracted per file, every chunk that isn't already in the vector
+    store is embedded in shared batches, and the new vectors are stored in one go. A file takes the category
+    of its nearest stored neighbours when they agree confidently and is clustered otherwise.
+    Returns {file_path: category}.
+    """
+    global last_cluster
+    results = {}
+    extracted = {}
+    for file_path in file_paths:
+        try:
+            # Read bounded, token-sized chunks of the file's text; binary files aren't embedded
+            text = extract_text(file_path)
+        except OSError as e:
+            print(f"Error classifying file: {e}")
+            text = None
+        if text is None or not text.chunks:
+            results[file_path] = "Others"
         else:
-            print(f"Number of documents processed: {len(document_embeddings)}")
-            category = "Others"
+            extracted[file_path] = text
 
-        return category
+    try:
+        # Reuse stored embeddings when the exact content was embedded before
+        store = get_vector_store()
+        embeddings = store.get_many({text.content_hash for text in extracted.values()})
+        missing = {}
+        for file_path, text in extracted.items():
+            if text.content_hash not in embeddings:
+                missing.setdefault(text.content_hash, (file_path, text.chunks))
+        if missing:
+            vectors = embed_documents([chunks for _, chunks in missing.values()])
+            store.add_many((file_path, content_hash, vector)
+                           for (content_hash, (file_path, _)), vector in zip(missing.items(), vectors))
+            embeddings.update(zip(missing, vectors))
     except Exception as e:
-        print(f"Error classifying file: {e}")
-        return "Others"
+        print(f"Error generating embeddings: {e}")
+        return {file_path: "Others" for file_path in file_paths}
 
-# Function to cluster documents and generate dynamic categories
-def cluster_documents():
-    print("Starting document clustering...")
-    
-    if len(document_embeddings) < 3:
-        return "Others"
-    
-    kmeans = KMeans(n_clusters=3, random_state=0).fit(document_embeddings)
-    labels = kmeans.labels_
+    try:
+        # Files much like already categorized ones join their category; the rest go to the clusterer
+        neighbour_categories = dict(zip(extracted, store.nearest_categories(
+            [embeddings[text.content_hash] for text in extracted.values()], exclude=list(extracted))))
+    except Exception as e:
+        print(f"Error searching similar files: {e}")
+        neighbour_categories = {}
 
-    category_names = []
-    for cluster_num in range(3):
-        cluster_docs = [document_contents[i] for i in range(len(labels)) if labels[i] == cluster_num]
-        top_keywords = get_top_keywords(cluster_docs)
-        category_names.append(" ".join(top_keywords) if top_keywords else "Miscellaneous")
+    for file_path, text in extracted.items():
+        if neighbour_categories.get(file_path) is not None:
+            results[file_path] = neighbour_categories[file_path]
+            continue
+        # Assign the document to a cluster without refitting the others
+        cluster = clusterer.add(embeddings[text.content_hash])
+        keyword_index.add(text.chunks[0][:SNIPPET_CHARS])
+        if cluster is None:
+            print(f"Number of documents processed: {clusterer.count}")
+            results[file_path] = "Others"
+            continue
+        last_cluster = cluster
+        try:
+            results[file_path] = get_cluster_name(cluster)
+        except Exception as e:
+            print(f"Error classifying file: {e}")
+            results[file_path] = "Others"
+    return results
 
-    return category_names[labels[-1]]
+# AI-based classification function
+def classify_and_categorize_file(file_path):
+    print(f"Classifying file: {file_path}")
+    return classify_and_categorize_files([file_path])[file_path]
+
+def get_cluster_name(cluster):
+    """Names a cluster after its top keywords; the name is cached until the cluster's centroid drifts."""
+    if cluster not in cluster_names or clusterer.has_drifted(cluster):
+        top_keywords = keyword_index.top_keywords(clusterer.members(cluster))
+        cluster_names[cluster] = " ".join(top_keywords) if len(top_keywords) else "Miscellaneous"
+        clusterer.mark_named(cluster)
+    return cluster_names[cluster]
+
+# Returns the category of the most recently clustered document
+def cluster_documents():
+    if last_cluster is None:
+        return "Others"
+    return get_cluster_name(last_cluster)
 
 # Extract top keywords using TF-IDF
 def get_top_keywords(documents, n_keywords=3):
-    from sklearn.feature_extraction.text import TfidfVectorizer
-    vectorizer = TfidfVectorizer(stop_words='english')
-    X = vectorizer.fit_transform(documents)
-    feature_array = np.array(vectorizer.get_feature_names_out())
-    tfidf_sorting = np.argsort(X.toarray()).flatten()[::-1]
-    top_keywords = feature_array[tfidf_sorting][:n_keywords]
-    return top_keywords
\ No newline at end of file
+    index = KeywordIndex()
+    for document in documents:
+        index.add(document)
+    return index.top_keywords(n_keywords=n_keywords)
@@ -0,0 +1,145 @@
+import hashlib
+import os
+
+import numpy as np
+
+from src.backend.settings import get_config_path, load_json_config
+
+# Which embedding backend classifier_ai uses: "openai" (default) or "hashing" (offline, CPU only).
+# The environment variable wins over "embedding_backend" in ~/.smartsort/settings.json
+BACKEND_ENV_VAR = "SMARTSORT_EMBEDDING_BACKEND"
+SETTINGS_KEY = "embedding_backend"
+
+HASHING_DIM = 1024
+HASHING_NGRAMS = (3, 4)
+
+# IDF weights fitted by HashingEmbeddingBackend.fit_idf are saved here, in the config directory
+IDF_FILE_NAME = "embedding_idf.npy"
+
+# Odd 64-bit constant (the golden ratio) for multiplicative hashing of n-gram codes
+_HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+class EmbeddingBackend:
+    """Turns a batch of texts into a float32 matrix with one row per text. name identifies the vector space."""
+
+    name = None
+
+    def embed(self, texts):
+        raise NotImplementedError
+
+
+class OpenAIEmbeddingBackend(EmbeddingBackend):
+    name = "openai"
+
+    def __init__(self, model="text-embedding-ada-002", base_url=None, api_key=None, timeout=None):
+        self.model = model
+        self.base_url = base_url
+        self.api_key = api_key
+        self.timeout = timeout
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            import openai
+            self._client = openai.OpenAI(base_url=self.base_url, api_key=self.api_key, timeout=self.timeout)
+        return self._client
+
+    def embed(self, texts):
+        response = self.client.embeddings.create(model=self.model, input=list(texts))
+        data = sorted(response.data, key=lambda item: item.index)
+        return np.asarray([item.embedding for item in data], dtype=np.float32)
+
+
+class HashingEmbeddingBackend(EmbeddingBackend):
+    """
+    Offline embeddings: character n-grams of the lowercased UTF-8 text are hashed into dim signed buckets
+    (the hashing trick), weighted by sublinear term frequency and, once fit_idf has been run, by IDF.
+    A whole batch is hashed and counted with a handful of NumPy operations, with no Python loop per n-gram.
+    """
+
+    def __init__(self, dim=HASHING_DIM, ngrams=HASHING_NGRAMS, idf_path=None):
+        self.dim = dim
+        self.ngrams = ngrams
+        self.idf_path = idf_path or get_config_path(IDF_FILE_NAME)
+        self.idf = None
+        if os.path.exists(self.idf_path):
+            idf = np.load(self.idf_path)
+            if idf.shape == (dim,):
+                self.idf = idf.astype(np.float32)
+
+    @property
+    def name(self):
+        # Vectors are only comparable under the same IDF weights, so each IDF table gets its own store
+        if self.idf is None:
+            return f"hashing-{self.dim}"
+        fingerprint = hashlib.blake2b(self.idf.tobytes(), digest_size=4).hexdigest()
+        return f"hashing-{self.dim}-idf{fingerprint}"
+
+    def counts(self, texts):
+        """Signed n-gram counts, shape (len(texts), dim)."""
+        encoded = [f" {text.lower()} ".encode("utf-8", "replace") for text in texts]
+        lengths = np.fromiter((len(data) for data in encoded), dtype=np.int64, count=len(encoded))
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+        documents = np.repeat(np.arange(len(encoded)), lengths)
+        counts = np.zeros(len(encoded) * self.dim, dtype=np.float64)
+
+        for n in self.ngrams:
+            if len(data) < n:
+                continue
+            # Pack each n-gram's bytes into one integer, keeping only n-grams inside a single text
+            span = len(data) - n + 1
+            codes = np.zeros(span, dtype=np.uint64)
+            for offset in range(n):
+                codes = (codes << np.uint64(8)) | data[offset:offset + span]
+            valid = documents[:span] == documents[n - 1:]
+            hashed = (codes[valid] + np.uint64(n)) * _HASH_MULTIPLIER
+            buckets = (hashed >> np.uint64(32)) % np.uint64(self.dim)
+            signs = np.where((hashed >> np.uint64(31)) & np.uint64(1), 1.0, -1.0)
+            flat = documents[:span][valid] * self.dim + buckets.astype(np.int64)
+            counts += np.bincount(flat, weights=signs, minlength=len(counts))
+        return counts.reshape(len(encoded), self.dim)
+
+    def embed(self, texts):
+        counts = self.counts(texts)
+        vectors = (np.sign(counts) * np.log1p(np.abs(counts))).astype(np.float32)
+        if self.idf is not None:
+            vectors *= self.idf
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return vectors / norms
+
+    def fit_idf(self, texts, save=True):
+        """
+        Learns bucket IDF weights from a sample corpus. The weights are part of name, so vectors made before
+        refitting stay in their old store and aren't mixed with the new ones.
+        """
+        counts = self.counts(texts)
+        document_frequency = (counts != 0).sum(axis=0)
+        self.idf = (np.log((1 + len(counts)) / (1 + document_frequency)) + 1).astype(np.float32)
+        if save:
+            os.makedirs(os.path.dirname(self.idf_path), exist_ok=True)
+            np.save(self.idf_path, self.idf)
+        return self.idf
+
+
+_backend = None
+
+
+def get_embedding_backend():
+    """Returns the configured embedding backend, creating it on first use."""
+    global _backend
+    if _backend is None:
+        name = os.environ.get(BACKEND_ENV_VAR) or (load_json_config("settings.json") or {}).get(SETTINGS_KEY)
+        if name == "hashing":
+            _backend = HashingEmbeddingBackend()
+        else:
+            _backend = OpenAIEmbeddingBackend()
+    return _backend
+
+
+def set_embedding_backend(backend):
+    """Replaces the embedding backend, e.g. with a HashingEmbeddingBackend in tests."""
+    global _backend
+    _backend = backend
@@ -0,0 +1,143 @@
+import numpy as np
+
+# Stored embeddings start with room for this many rows and double when full
+INITIAL_CAPACITY = 1024
+
+# Full re-centering (a few Lloyd iterations over every stored embedding) runs after this many additions
+RECENTER_EVERY = 500
+RECENTER_ITERATIONS = 5
+
+# A cluster's cached name is recomputed once its centroid moved this far (relative to its length)
+DRIFT_THRESHOLD = 0.05
+
+MAX_AUTO_CLUSTERS = 20
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+def auto_cluster_count(n_documents, max_clusters=MAX_AUTO_CLUSTERS):
+    """Rule-of-thumb k = sqrt(n / 2), kept between 2 and max_clusters."""
+    return int(min(max_clusters, max(2, round((n_documents / 2) ** 0.5))))
+
+
+class IncrementalClusterer:
+    """
+    Online clustering of unit-normalized embeddings.
+
+    Each new embedding is assigned to its nearest centroid (cosine similarity), which then moves towards it
+    by 1 / cluster size, so one addition costs O(k * dim) instead of a full KMeans refit. Every
+    RECENTER_EVERY additions all stored embeddings are re-assigned and the centroids recomputed, which also
+    re-evaluates k when it is chosen automatically (n_clusters=None).
+    Embeddings live in a preallocated float32 matrix that grows geometrically.
+    """
+
+    def __init__(self, n_clusters=None, capacity=INITIAL_CAPACITY, recenter_every=RECENTER_EVERY,
+                 drift_threshold=DRIFT_THRESHOLD, max_clusters=MAX_AUTO_CLUSTERS, seed=0):
+        self.fixed_clusters = n_clusters
+        self.capacity = capacity
+        self.recenter_every = recenter_every
+        self.drift_threshold = drift_threshold
+        self.max_clusters = max_clusters
+        self.rng = np.random.default_rng(seed)
+
+        self.embeddings = None  # (capacity, dim) float32, rows [:count] in use
+        self.labels = np.empty(capacity, dtype=np.int32)
+        self.count = 0
+        self.centroids = None
+        self.cluster_sizes = None
+        self.named_centroids = {}  # cluster -> centroid at the time its name was computed
+        self.since_recenter = 0
+
+    @property
+    def n_clusters(self):
+        return 0 if self.centroids is None else len(self.centroids)
+
+    def _target_clusters(self):
+        return self.fixed_clusters or auto_cluster_count(self.count, self.max_clusters)
+
+    def _store(self, vector):
+        if self.embeddings is None:
+            self.embeddings = np.empty((self.capacity, vector.shape[0]), dtype=np.float32)
+        elif self.count == len(self.embeddings):
+            grown = np.empty((len(self.embeddings) * 2, self.embeddings.shape[1]), dtype=np.float32)
+            grown[:self.count] = self.embeddings[:self.count]
+            self.embeddings = grown
+            self.labels = np.resize(self.labels, len(grown))
+        self.embeddings[self.count] = vector
+        self.count += 1
+
+    def _initialize(self, k):
+        """k-means++ seeding over the stored embeddings, followed by a re-centering pass."""
+        data = self.embeddings[:self.count]
+        centroids = [data[self.rng.integers(self.count)]]
+        closest = 1 - data @ centroids[0]
+        for _ in range(1, k):
+            weights = np.clip(closest, 0, None)
+            total = weights.sum()
+            index = self.rng.choice(self.count, p=weights / total) if total > 0 else self.rng.integers(self.count)
+            centroids.append(data[index])
+            closest = np.minimum(closest, 1 - data @ data[index])
+        self.centroids = np.array(centroids, dtype=np.float32)
+        self.named_centroids.clear()
+        self.recenter()
+
+    def recenter(self, iterations=RECENTER_ITERATIONS):
+        """Lloyd iterations over every stored embedding; empty clusters keep their previous centroid."""
+        data = self.embeddings[:self.count]
+        k = len(self.centroids)
+        for _ in range(iterations):
+            labels = np.argmax(data @ self.centroids.T, axis=1)
+            sums = np.zeros_like(self.centroids)
+            np.add.at(sums, labels, data)
+            sizes = np.bincount(labels, minlength=k)
+            occupied = sizes > 0
+            self.centroids[occupied] = _normalize(sums[occupied])
+        self.labels[:self.count] = labels
+        self.cluster_sizes = np.bincount(labels, minlength=k).astype(np.float64)
+        self.since_recenter = 0
+
+    def add(self, embedding):
+        """Stores an embedding and returns its cluster, or None while there are fewer documents than clusters."""
+        vector = _normalize(np.asarray(embedding, dtype=np.float32))
+        self._store(vector)
+        self.since_recenter += 1
+
+        if self.centroids is None:
+            if self.count >= self._target_clusters():
+                self._initialize(self._target_clusters())
+                return int(self.labels[self.count - 1])
+            return None
+
+        if self.since_recenter >= self.recenter_every:
+            k = self._target_clusters()
+            if k != self.n_clusters:
+                self._initialize(k)
+            else:
+                self.recenter()
+            return int(self.labels[self.count - 1])
+
+        cluster = int(np.argmax(self.centroids @ vector))
+        self.cluster_sizes[cluster] += 1
+        centroid = self.centroids[cluster]
+        centroid += (vector - centroid) / self.cluster_sizes[cluster]
+        self.centroids[cluster] = _normalize(centroid)
+        self.labels[self.count - 1] = cluster
+        return cluster
+
+    def members(self, cluster):
+        """Row indices of the stored embeddings currently assigned to cluster."""
+        return np.flatnonzero(self.labels[:self.count] == cluster)
+
+    def has_drifted(self, cluster):
+        """True if cluster was never named or its centroid moved past the drift threshold since."""
+        named = self.named_centroids.get(cluster)
+        if named is None:
+            return True
+        return float(np.linalg.norm(self.centroids[cluster] - named)) > self.drift_threshold
+
+    def mark_named(self, cluster):
+        self.named_centroids[cluster] = self.centroids[cluster].copy()
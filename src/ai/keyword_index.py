@@ -0,0 +1,121 @@
+import re
+
+import numpy as np
+
+# Same tokens as scikit-learn's default TfidfVectorizer: runs of two or more word characters
+TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+
+# Only a document's most frequent terms are kept, so memory per document is bounded
+MAX_TERMS_PER_DOCUMENT = 64
+
+INITIAL_CAPACITY = 1024
+
+ENGLISH_STOP_WORDS = frozenset("""
+a about above after again against all almost alone along already also although always am among an and another
+any anyhow anyone anything anyway anywhere are around as at back be became because become becomes been before
+being below beside besides between beyond both but by can cannot could did do does doing done down due during
+each either else elsewhere enough etc even ever every everyone everything everywhere except few first for
+former formerly from further get give go had has have having he hence her here hers herself him himself his how
+however i ie if in indeed into is it its itself just keep last latter least less made many may me meanwhile
+might mine more moreover most mostly much must my myself namely neither never nevertheless next no nobody none
+nor not nothing now nowhere of off often on once one only onto or other others otherwise our ours ourselves out
+over own per perhaps please put rather re same see seem seemed seeming seems several she should show since so
+some somehow someone something sometime sometimes somewhere still such take than that the their theirs them
+themselves then thence there thereafter thereby therefore therein thereupon these they this those though
+through throughout thru thus to together too toward towards under until up upon us very via was we well were
+what whatever when whence whenever where whereafter whereas whereby wherein whereupon wherever whether which
+while whither who whoever whole whom whose why will with within without would yet you your yours yourself
+yourselves
+""".split())
+
+
+def tokenize(text):
+    return [token for token in TOKEN_PATTERN.findall(text.lower())
+            if token not in ENGLISH_STOP_WORDS and not token.isdigit()]
+
+
+class KeywordIndex:
+    """
+    Incremental, sparse TF-IDF over documents added one at a time.
+
+    The vocabulary and document frequencies grow as documents arrive; each document is stored as a row of
+    (term id, L2-normalized term frequency) pairs in CSR-style arrays, never as a dense document-term matrix.
+    Keywords for a set of documents (a cluster) come from summing their rows per term with np.bincount,
+    weighting the sums by the current IDF and picking the best terms with argpartition.
+    """
+
+    def __init__(self, max_terms=MAX_TERMS_PER_DOCUMENT):
+        self.max_terms = max_terms
+        self.vocabulary = {}
+        self.terms = []
+        self.document_frequency = np.zeros(INITIAL_CAPACITY, dtype=np.int64)
+        self.indptr = np.zeros(INITIAL_CAPACITY + 1, dtype=np.int64)
+        self.term_ids = np.empty(INITIAL_CAPACITY * 16, dtype=np.int32)
+        self.weights = np.empty(INITIAL_CAPACITY * 16, dtype=np.float32)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def _term_id(self, term):
+        term_id = self.vocabulary.get(term)
+        if term_id is None:
+            term_id = self.vocabulary[term] = len(self.terms)
+            self.terms.append(term)
+            if term_id == len(self.document_frequency):
+                self.document_frequency = np.concatenate([self.document_frequency,
+                                                          np.zeros_like(self.document_frequency)])
+        return term_id
+
+    def add(self, text):
+        """Adds a document and returns its row."""
+        frequencies = {}
+        for token in tokenize(text):
+            frequencies[token] = frequencies.get(token, 0) + 1
+        top = sorted(frequencies.items(), key=lambda item: -item[1])[:self.max_terms]
+        ids = np.fromiter((self._term_id(term) for term, _ in top), dtype=np.int32, count=len(top))
+        self.document_frequency[ids] += 1
+
+        start = self.indptr[self.count]
+        end = start + len(ids)
+        if end > len(self.term_ids):
+            self.term_ids = np.resize(self.term_ids, max(end, len(self.term_ids) * 2))
+            self.weights = np.resize(self.weights, len(self.term_ids))
+        counts = np.fromiter((count for _, count in top), dtype=np.float32, count=len(top))
+        self.term_ids[start:end] = ids
+        self.weights[start:end] = counts / (np.linalg.norm(counts) or 1)
+        if self.count + 1 == len(self.indptr):
+            self.indptr = np.resize(self.indptr, len(self.indptr) * 2)
+        self.count += 1
+        self.indptr[self.count] = end
+        return self.count - 1
+
+    def idf(self):
+        """Smoothed IDF as in scikit-learn: ln((1 + n) / (1 + df)) + 1."""
+        df = self.document_frequency[:len(self.terms)]
+        return np.log((1 + self.count) / (1 + df)) + 1
+
+    def top_keywords(self, rows=None, n_keywords=3):
+        """The n_keywords terms with the highest summed TF-IDF over rows (all documents when rows is None)."""
+        if rows is None:
+            rows = np.arange(self.count)
+        rows = np.asarray(rows, dtype=np.int64)
+        if len(rows) == 0 or not self.terms:
+            return []
+
+        # Gather the rows' (term id, count) pairs without a Python loop over documents
+        starts = self.indptr[rows]
+        lengths = self.indptr[rows + 1] - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return []
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+        scores = np.bincount(self.term_ids[offsets], weights=self.weights[offsets], minlength=len(self.terms))
+        scores *= self.idf()
+
+        n_keywords = min(n_keywords, int(np.count_nonzero(scores)))
+        if n_keywords == 0:
+            return []
+        best = np.argpartition(-scores, n_keywords - 1)[:n_keywords]
+        best = best[np.argsort(-scores[best])]
+        return [self.terms[term_id] for term_id in best]
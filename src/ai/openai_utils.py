@@ -1,38 +1,14 @@
-import os
-import openai
+from src.ai import ai_categorizer
 
-# Set up OpenAI API key from environment variables
-openai_api_key = os.getenv('OPENAI_API_KEY')
-if openai_api_key is None:
-    raise ValueError("OpenAI API key is not set in the environment.")
-
-openai.api_key = openai_api_key
+# The openai client reads OPENAI_API_KEY itself when the first request is made (see ai_backends), so
+# importing this module neither needs the key nor loads openai
 
 def categorize_with_ai(file_name):
     """
     Use OpenAI GPT-4 to categorize files based on their title.
+    Shares the cached, batched implementation in ai_categorizer.
     """
-    try:
-        print(f"Feeding title '{file_name}' into GPT-4 for categorization...")
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a file categorization assistant. Given a file title, categorize the file and suggest a folder name."
-                },
-                {
-                    "role": "user",
-                    "content": f"Categorize the file titled: {file_name}"
-                }
-            ]
-        )
-        category = response['choices'][0]['message']['content'].strip()
-        print(f"AI categorized {file_name} as: {category}")
-        return category
-    except Exception as e:
-        print(f"Error categorizing with GPT: {e}")
-        return None
+    return ai_categorizer.categorize_with_ai(file_name)
 
 
 
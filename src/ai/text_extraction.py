@@ -0,0 +1,130 @@
+import codecs
+import hashlib
+import os
+import re
+from collections import namedtuple
+
+from src.backend.content_sniffer import SNIFF_SIZE, sniff_bytes
+
+# Files up to this size are read whole; larger ones are sampled at the head, middle and tail
+SAMPLE_SIZE = 64 * 1024
+MAX_FULL_READ = 3 * SAMPLE_SIZE
+
+# Reads go through a buffer of this size, so memory per file stays constant whatever its size
+READ_CHUNK_SIZE = 16 * 1024
+
+# Embedding inputs are cut at this many tokens (approximated as words / punctuation runs)
+CHUNK_TOKENS = 512
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]+")
+
+# Byte order marks and the encodings they announce
+TEXT_BOMS = [(codecs.BOM_UTF8, "utf-8"), (codecs.BOM_UTF16_LE, "utf-16-le"), (codecs.BOM_UTF16_BE, "utf-16-be")]
+
+ExtractedText = namedtuple("ExtractedText", ["chunks", "content_hash"])
+
+
+def detect_encoding(head):
+    """
+    Returns (encoding, bom_length) for a file starting with head, or None if it isn't text.
+    A byte order mark decides first; NUL bytes in every other position mean BOM-less UTF-16. Files without
+    NULs or a known binary signature are text: UTF-8 when they decode as such, Latin-1 otherwise.
+    """
+    for bom, encoding in TEXT_BOMS:
+        if head.startswith(bom):
+            return encoding, len(bom)
+    if len(head) < 4:
+        return "utf-8", 0
+    if b"\0" in head:
+        even_nuls, odd_nuls = head[0::2].count(0), head[1::2].count(0)
+        if even_nuls == 0 and odd_nuls > len(head) // 4:
+            return "utf-16-le", 0
+        if odd_nuls == 0 and even_nuls > len(head) // 4:
+            return "utf-16-be", 0
+        return None
+    category = sniff_bytes(head)[1]
+    if category == "text":
+        return "utf-8", 0
+    if category is not None:
+        return None
+    return "latin-1", 0
+
+
+def _sample_ranges(size, start=0, alignment=1):
+    """
+    (offset, length) ranges to read: the whole file, or head, middle and tail samples. Reading begins at
+    start (after a byte order mark) and offsets are multiples of alignment (2 for UTF-16).
+    """
+    if size - start <= MAX_FULL_READ:
+        return [(start, size - start)]
+    middle = (size - SAMPLE_SIZE) // 2
+    tail = size - SAMPLE_SIZE
+    return [(start, SAMPLE_SIZE), (middle - middle % alignment, SAMPLE_SIZE), (tail - tail % alignment, SAMPLE_SIZE)]
+
+
+def _read_range(f, offset, length, digest, encoding="utf-8"):
+    """Yields decoded text for length bytes at offset, READ_CHUNK_SIZE bytes at a time."""
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    f.seek(offset)
+    buffer = bytearray(READ_CHUNK_SIZE)
+    view = memoryview(buffer)
+    remaining = length
+    while remaining > 0:
+        read = f.readinto(view[:min(READ_CHUNK_SIZE, remaining)])
+        if not read:
+            break
+        digest.update(view[:read])
+        remaining -= read
+        yield decoder.decode(view[:read])
+    yield decoder.decode(b"", final=True)
+
+
+def iter_tokens(pieces):
+    """Splits a stream of text pieces into tokens, carrying a word cut at a piece boundary over to the next."""
+    carry = ""
+    for piece in pieces:
+        text = carry + piece
+        carry = ""
+        tokens = TOKEN_PATTERN.findall(text)
+        if tokens and text and not text[-1].isspace():
+            carry = tokens.pop()
+        yield from tokens
+    if carry:
+        yield carry
+
+
+def chunk_tokens(tokens, chunk_tokens=CHUNK_TOKENS):
+    """Groups tokens into texts of at most chunk_tokens tokens."""
+    chunk = []
+    for token in tokens:
+        chunk.append(token)
+        if len(chunk) == chunk_tokens:
+            yield " ".join(chunk)
+            chunk = []
+    if chunk:
+        yield " ".join(chunk)
+
+
+def extract_text(file_path, chunk_tokens_limit=CHUNK_TOKENS):
+    """
+    Reads the text of a file as embedding input without ever loading more than SAMPLE_SIZE at a time.
+    Binary files are detected from the first block and skipped (returns None); text may be UTF-8, UTF-16 or
+    Latin-1 (see detect_encoding). Files over MAX_FULL_READ are sampled at the head, middle and tail.
+    Returns ExtractedText(chunks, content_hash), where content_hash is a BLAKE2 digest of exactly the bytes
+    that were read, so it identifies the embedding input.
+    """
+    size = os.path.getsize(file_path)
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(size.to_bytes(8, "little"))
+    with open(file_path, "rb", buffering=0) as f:
+        detected = detect_encoding(f.read(SNIFF_SIZE))
+        if detected is None:
+            return None
+        encoding, bom_length = detected
+        alignment = 2 if encoding.startswith("utf-16") else 1
+
+        chunks = []
+        for offset, length in _sample_ranges(size, bom_length, alignment):
+            tokens = iter_tokens(_read_range(f, offset, length, digest, encoding))
+            chunks.extend(chunk_tokens(tokens, chunk_tokens_limit))
+    return ExtractedText(chunks, digest.hexdigest())
@@ -0,0 +1,262 @@
+import hashlib
+import os
+import struct
+from collections import Counter
+
+import numpy as np
+
+from src.io.processed_data import (DATABASE_PATH, add_embedding_rows, count_embeddings, get_embedding_paths,
+                                   lookup_embedding_rows, lookup_many, normalize_path)
+
+# Each store's matrix file sits next to the DB: a small header followed by float32 rows
+VECTORS_DIR = os.path.dirname(os.path.abspath(DATABASE_PATH))
+DEFAULT_STORE = "openai"
+HEADER = struct.Struct("<4sII")  # magic, format version, dimension
+MAGIC = b"SSVS"
+FORMAT_VERSION = 1
+
+INITIAL_CAPACITY = 1024
+
+# Exact search scans the matrix in blocks of this many rows to keep the score matrix small
+SEARCH_BLOCK_ROWS = 65536
+
+# Above this many vectors queries go through a coarse IVF index instead of scanning everything
+IVF_THRESHOLD = 100_000
+IVF_PROBES = 8
+IVF_TRAINING_SAMPLE = 50_000
+# The index is retrained once the store has grown by this factor; rows added since are scanned exactly
+IVF_REBUILD_GROWTH = 1.25
+
+# Category votes only count neighbours at least this similar, and need this share of the votes to win
+NEIGHBOUR_MIN_SCORE = 0.75
+NEIGHBOUR_MIN_SHARE = 0.6
+
+
+def hash_bytes(data):
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+def hash_file(file_path, chunk_size=1024 * 1024):
+    """BLAKE2 of the file's content, read in chunks."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_vectors_path(store):
+    path = os.path.join(VECTORS_DIR, f"embeddings-{store}.f32")
+    # Before stores existed the OpenAI vectors lived in embeddings.f32
+    legacy_path = os.path.join(VECTORS_DIR, "embeddings.f32")
+    if store == DEFAULT_STORE and not os.path.exists(path) and os.path.exists(legacy_path):
+        os.replace(legacy_path, path)
+    return path
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+def _top_k(scores, k):
+    """Indices of the k highest scores per row, best first, using argpartition."""
+    k = min(k, scores.shape[1])
+    if k == 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64)
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, part, axis=1), axis=1)
+    return np.take_along_axis(part, order, axis=1)
+
+
+class VectorStore:
+    """
+    Embeddings on disk: a memory-mapped float32 matrix (one unit-normalized row per distinct content) and
+    the embeddings table in the DB mapping content hashes and file paths to rows.
+    Because rows are keyed by content hash, a file whose content hasn't changed is never embedded twice.
+    Each embedding backend gets its own store, since their vectors aren't comparable.
+    """
+
+    def __init__(self, store=DEFAULT_STORE, path=None):
+        self.store = store
+        self.path = path or get_vectors_path(store)
+        self.dim = None
+        self.matrix = None
+        self.ivf = None
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                magic, version, dim = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise ValueError(f"{self.path} is not a Smart Sort vector file")
+            self._open(dim)
+
+    def _open(self, dim):
+        self.dim = dim
+        rows = (os.path.getsize(self.path) - HEADER.size) // (4 * dim)
+        self.matrix = np.memmap(self.path, dtype=np.float32, mode="r+", offset=HEADER.size, shape=(rows, dim))
+
+    def _ensure_capacity(self, rows, dim):
+        if self.matrix is None:
+            with open(self.path, "wb") as f:
+                f.write(HEADER.pack(MAGIC, FORMAT_VERSION, dim))
+                f.truncate(HEADER.size + INITIAL_CAPACITY * dim * 4)
+            self._open(dim)
+        if dim != self.dim:
+            raise ValueError(f"Embedding dimension {dim} doesn't match the store's {self.dim}")
+        if rows > len(self.matrix):
+            capacity = max(rows, len(self.matrix) * 2)
+            self.matrix.flush()
+            del self.matrix
+            with open(self.path, "r+b") as f:
+                f.truncate(HEADER.size + capacity * dim * 4)
+            self._open(dim)
+
+    def __len__(self):
+        return count_embeddings(self.store) if self.matrix is not None else 0
+
+    def get_many(self, content_hashes):
+        """
+        Returns {content_hash: vector} for the hashes that are stored. DB rows the matrix file doesn't cover
+        (it was deleted, or is from an older copy of the DB) count as not stored.
+        """
+        if self.matrix is None:
+            return {}
+        rows = lookup_embedding_rows(self.store, content_hashes)
+        return {content_hash: np.array(self.matrix[row]) for content_hash, row in rows.items()
+                if row < len(self.matrix)}
+
+    def get(self, content_hash):
+        return self.get_many([content_hash]).get(content_hash)
+
+    def add_many(self, entries):
+        """Stores (file_path, content_hash, vector) entries. Returns {content_hash: row}."""
+        entries = list(entries)
+        if not entries:
+            return {}
+        vectors = _normalize(np.asarray([vector for _, _, vector in entries], dtype=np.float32))
+        by_hash = {content_hash: vector for (_, content_hash, _), vector in zip(entries, vectors)}
+
+        def write(new_rows):
+            # Runs before the DB rows are committed, so a crash never leaves a row pointing at an unwritten vector
+            self._ensure_capacity(max(new_rows.values()) + 1, vectors.shape[1])
+            for content_hash, row in new_rows.items():
+                self.matrix[row] = by_hash[content_hash]
+            self.matrix.flush()
+
+        return add_embedding_rows(self.store, [(file_path, content_hash) for file_path, content_hash, _ in entries],
+                                  before_commit=write)
+
+    def add(self, file_path, content_hash, vector):
+        return self.add_many([(file_path, content_hash, vector)])[content_hash]
+
+    def _search_exact(self, queries, k, count, first=0):
+        """Scans rows first..count-1 block by block, keeping the running top k."""
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        for start in range(first, count, SEARCH_BLOCK_ROWS):
+            block = np.asarray(self.matrix[start:min(count, start + SEARCH_BLOCK_ROWS)])
+            scores = queries @ block.T
+            top = _top_k(scores, k)
+            best_scores = np.concatenate([best_scores, np.take_along_axis(scores, top, axis=1)], axis=1)
+            best_rows = np.concatenate([best_rows, top + start], axis=1)
+            keep = _top_k(best_scores, k)
+            best_scores = np.take_along_axis(best_scores, keep, axis=1)
+            best_rows = np.take_along_axis(best_rows, keep, axis=1)
+        return best_rows, best_scores
+
+    def build_ivf(self, count=None, n_lists=None, iterations=10, seed=0):
+        """Trains a coarse quantizer (k-means over a sample) and buckets every row by its nearest centroid."""
+        count = count or len(self)
+        n_lists = n_lists or int(np.sqrt(count))
+        rng = np.random.default_rng(seed)
+        sample = np.asarray(self.matrix[np.sort(rng.choice(count, min(count, IVF_TRAINING_SAMPLE), replace=False))])
+        centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            occupied = np.bincount(labels, minlength=n_lists) > 0
+            centroids[occupied] = _normalize(sums[occupied])
+
+        assignments = np.empty(count, dtype=np.int32)
+        for start in range(0, count, SEARCH_BLOCK_ROWS):
+            block = np.asarray(self.matrix[start:min(count, start + SEARCH_BLOCK_ROWS)])
+            assignments[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+        order = np.argsort(assignments, kind="stable")
+        boundaries = np.searchsorted(assignments[order], np.arange(n_lists + 1))
+        self.ivf = {"count": count, "centroids": centroids, "order": order, "boundaries": boundaries}
+
+    def _search_ivf(self, queries, k, probes):
+        ivf = self.ivf
+        probe_lists = _top_k(queries @ ivf["centroids"].T, probes)
+        rows_out = np.full((len(queries), k), -1, dtype=np.int64)
+        scores_out = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        for i, lists in enumerate(probe_lists):
+            candidates = np.concatenate([ivf["order"][ivf["boundaries"][l]:ivf["boundaries"][l + 1]] for l in lists])
+            if len(candidates) == 0:
+                continue
+            candidates.sort()
+            scores = np.asarray(self.matrix[candidates]) @ queries[i]
+            top = _top_k(scores[None, :], k)[0]
+            rows_out[i, :len(top)] = candidates[top]
+            scores_out[i, :len(top)] = scores[top]
+        return rows_out, scores_out
+
+    def search(self, queries, k=10, probes=IVF_PROBES):
+        """
+        Cosine top-k for a batch of query vectors. Returns (rows, scores), each of shape (len(queries), k).
+        Exact below IVF_THRESHOLD vectors. Above it the IVF index answers for the rows it was built from and
+        the rows added since are scanned exactly and merged in, so new vectors are found straight away; the
+        index is retrained once the store has grown by IVF_REBUILD_GROWTH.
+        """
+        count = len(self)
+        queries = _normalize(np.atleast_2d(np.asarray(queries, dtype=np.float32)))
+        if count == 0:
+            return np.empty((len(queries), 0), dtype=np.int64), np.empty((len(queries), 0), dtype=np.float32)
+        if count < IVF_THRESHOLD:
+            return self._search_exact(queries, k, count)
+        if self.ivf is None or count > IVF_REBUILD_GROWTH * self.ivf["count"]:
+            self.build_ivf(count)
+        rows, scores = self._search_ivf(queries, k, probes)
+        if count > self.ivf["count"]:
+            new_rows, new_scores = self._search_exact(queries, k, count, self.ivf["count"])
+            rows = np.concatenate([rows, new_rows], axis=1)
+            scores = np.concatenate([scores, new_scores], axis=1)
+            keep = _top_k(scores, k)
+            rows = np.take_along_axis(rows, keep, axis=1)
+            scores = np.take_along_axis(scores, keep, axis=1)
+        return rows, scores
+
+    def similar_files(self, vector, k=10):
+        """Returns [(file_path, score)] for the stored files most similar to vector."""
+        rows, scores = self.search(vector, k)
+        paths = get_embedding_paths(self.store, (row for row in rows[0] if row >= 0))
+        return [(paths[row], float(score)) for row, score in zip(rows[0], scores[0]) if row in paths]
+
+    def nearest_categories(self, vectors, k=15, exclude=None, min_score=NEIGHBOUR_MIN_SCORE,
+                           min_share=NEIGHBOUR_MIN_SHARE):
+        """
+        Categorizes a batch of vectors by a score-weighted vote of their k most similar files that already have a
+        category in the DB, so new files can be placed without clustering the whole corpus. Neighbours scoring
+        below min_score don't vote, and a vector gets None unless the winning category holds min_share of the
+        votes. exclude optionally gives, per vector, a file path that shouldn't vote for itself.
+        """
+        rows, scores = self.search(vectors, k)
+        paths = get_embedding_paths(self.store, (row for row in rows.ravel() if row >= 0))
+        records = lookup_many(set(paths.values()))
+        exclude = [normalize_path(path) if path else None for path in (exclude or [None] * len(rows))]
+        categories = []
+        for query_rows, query_scores, skip in zip(rows, scores, exclude):
+            votes = Counter()
+            for row, score in zip(query_rows, query_scores):
+                path = paths.get(row)
+                if path in records and score >= min_score and normalize_path(path) != skip:
+                    votes[records[path]["category"]] += float(score)
+            category, weight = votes.most_common(1)[0] if votes else (None, 0)
+            categories.append(category if votes and weight >= min_share * sum(votes.values()) else None)
+        return categories
+
+    def nearest_category(self, vector, k=15, **kwargs):
+        """nearest_categories for a single vector."""
+        return self.nearest_categories([vector], k, **kwargs)[0]
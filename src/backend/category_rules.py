@@ -0,0 +1,125 @@
+import fnmatch
+import json
+import os
+import re
+
+from src.backend.settings import load_json_config
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "category_rules.json")
+
+# Users override or extend the defaults with a file of the same shape in their config directory
+USER_RULES_FILE = "category_rules.json"
+
+
+class CategoryRules:
+    """
+    Extension and filename rules compiled for fast lookups.
+
+    Name rules (globs and regexes) are checked first, as one combined pattern, so they can override extensions.
+    Then the longest known compound suffix (e.g. "tar.gz") wins over the final suffix ("gz"),
+    both looked up in a dict keyed by the lowercased suffix.
+    """
+
+    def __init__(self, extensions, globs=(), regexes=(), colors=None, default_category="other"):
+        self.default_category = default_category
+        self.colors = dict(colors or {})
+
+        # {"pdf": "document", "tar.gz": "archive", ...}
+        self.suffix_categories = {}
+        for category, suffixes in extensions.items():
+            for suffix in suffixes:
+                self.suffix_categories[suffix.lower().lstrip(".")] = category
+        self.max_suffix_parts = max((suffix.count(".") + 1 for suffix in self.suffix_categories), default=1)
+
+        alternatives = []
+        self.rule_categories = []
+        for glob in globs:
+            alternatives.append(fnmatch.translate(glob["pattern"]))
+            self.rule_categories.append(glob["category"])
+        for regex in regexes:
+            # Regex rules match anywhere in the name, like re.search
+            alternatives.append(f".*?(?:{regex['pattern']})")
+            self.rule_categories.append(regex["category"])
+
+        self.rule_groups = [f"_rule{i}" for i in range(len(alternatives))]
+        if alternatives:
+            self.name_pattern = re.compile(
+                "|".join(f"(?P<{group}>{alternative})" for group, alternative in zip(self.rule_groups, alternatives)),
+                re.IGNORECASE)
+        else:
+            self.name_pattern = None
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config.get("extensions", {}), config.get("globs", []), config.get("regex", []),
+                   config.get("colors"), config.get("default_category", "other"))
+
+    def categorize(self, file_name):
+        """Returns the category for a bare file name (not a path)."""
+        if self.name_pattern is not None:
+            match = self.name_pattern.match(file_name)
+            if match is not None:
+                for group, category in zip(self.rule_groups, self.rule_categories):
+                    if match.group(group) is not None:
+                        return category
+
+        name = file_name.lower()
+        end = len(name)
+        category = None
+        # Walk the dots from the right; a longer suffix that is known overrides a shorter one
+        for _ in range(self.max_suffix_parts):
+            dot = name.rfind(".", 0, end)
+            if dot <= 0:
+                break
+            found = self.suffix_categories.get(name[dot + 1:])
+            if found is not None:
+                category = found
+            end = dot
+        return category or self.default_category
+
+    def categorize_path(self, file_path):
+        return self.categorize(os.path.basename(file_path))
+
+    def get_color(self, category):
+        return self.colors.get(category, self.colors.get(self.default_category))
+
+    def extension_map(self):
+        """Returns {extension: category} for single suffixes, e.g. {"pdf": "document"}."""
+        return {suffix: category for suffix, category in self.suffix_categories.items() if "." not in suffix}
+
+
+def load_rules_config():
+    """Loads the bundled rules and merges the user's category_rules.json over them."""
+    with open(DEFAULT_RULES_PATH, "r", encoding="utf-8") as f:
+        config = json.load(f)
+
+    user_config = load_json_config(USER_RULES_FILE)
+    if user_config:
+        # A category listed by the user replaces the bundled suffixes for it; rules are added in front
+        for category, suffixes in user_config.get("extensions", {}).items():
+            for other in config["extensions"].values():
+                other[:] = [suffix for suffix in other if suffix not in suffixes]
+            config["extensions"][category] = suffixes
+        config["globs"] = user_config.get("globs", []) + config.get("globs", [])
+        config["regex"] = user_config.get("regex", []) + config.get("regex", [])
+        config["colors"].update(user_config.get("colors", {}))
+        config["default_category"] = user_config.get("default_category", config.get("default_category", "other"))
+    return config
+
+
+_rules = None
+
+
+def get_rules():
+    """Returns the shared, compiled rule set, loading it on first use."""
+    global _rules
+    if _rules is None:
+        _rules = CategoryRules.from_config(load_rules_config())
+    return _rules
+
+
+def reload_rules():
+    """Recompiles the rules, e.g. after the user edited their config file."""
+    global _rules
+    _rules = None
+    return get_rules()
@@ -0,0 +1,178 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Only the start of a file is read; every signature below fits well inside it
+SNIFF_SIZE = 4096
+
+SNIFF_WORKERS = 8
+
+# Extensions that say nothing about the content, so the sniffer gets a say even though the rules matched
+GENERIC_EXTENSIONS = {"", "bin", "dat"}
+
+# Files still being written by a browser, torrent client or our own copies. They are renamed once complete,
+# so they are never sniffed, planned or moved
+PARTIAL_DOWNLOAD_EXTENSIONS = {"crdownload", "part", "partial", "download", "opdownload", "tmp", "!ut", "!qb",
+                               "smartsort-part", "smartsort-link"}
+
+_local = threading.local()
+
+
+def _read_head(file_path):
+    """Reads up to SNIFF_SIZE bytes into a buffer reused by the calling thread."""
+    buffer = getattr(_local, "buffer", None)
+    if buffer is None:
+        buffer = _local.buffer = bytearray(SNIFF_SIZE)
+    with open(file_path, "rb", buffering=0) as f:
+        read = f.readinto(buffer)
+    return memoryview(buffer)[:read]
+
+
+def _sniff_zip(head):
+    # The first local file header names tell OOXML and OpenDocument containers apart from plain archives
+    data = bytes(head)
+    if b"[Content_Types].xml" in data or b"_rels/" in data:
+        if b"word/" in data:
+            return "application/vnd.openxmlformats-officedocument.wordprocessingml.document", "document"
+        if b"xl/" in data:
+            return "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "document"
+        if b"ppt/" in data:
+            return "application/vnd.openxmlformats-officedocument.presentationml.presentation", "document"
+        return "application/vnd.openxmlformats-officedocument", "document"
+    if data[30:38] == b"mimetype":
+        if b"application/epub+zip" in data[38:80]:
+            return "application/epub+zip", "document"
+        if b"application/vnd.oasis.opendocument" in data[38:120]:
+            return "application/vnd.oasis.opendocument", "document"
+    return "application/zip", "archive"
+
+
+def _sniff_iso_media(head):
+    brand = bytes(head[8:12])
+    if brand in (b"M4A ", b"M4B "):
+        return "audio/mp4", "audio"
+    if brand in (b"heic", b"heix", b"mif1", b"msf1"):
+        return "image/heic", "image"
+    if brand == b"qt  ":
+        return "video/quicktime", "video"
+    return "video/mp4", "video"
+
+
+# UTF-8 and UTF-16 byte order marks. They are checked first: FF FE would otherwise pass for an MPEG frame sync
+TEXT_BOMS = (b"\xef\xbb\xbf", b"\xff\xfe", b"\xfe\xff")
+
+
+def _is_mpeg_frame(start):
+    """True if start begins with a plausible MPEG audio frame header (sync, version, layer, bitrate, rate)."""
+    if start[0] != 0xFF or start[1] & 0xE0 != 0xE0 or start[1] == 0xFE:
+        return False
+    version = (start[1] >> 3) & 0b11
+    layer = (start[1] >> 1) & 0b11
+    bitrate = start[2] >> 4
+    sample_rate = (start[2] >> 2) & 0b11
+    return version != 0b01 and layer != 0b00 and bitrate != 0b1111 and sample_rate != 0b11
+
+
+def _is_pe_executable(head):
+    """An "MZ" header whose e_lfanew points at a "PE" signature (or past the sniffed bytes, but not absurdly far)."""
+    if len(head) < 0x40:
+        return False
+    e_lfanew = int.from_bytes(bytes(head[0x3C:0x40]), "little")
+    if not 0x40 <= e_lfanew < 0x10000:
+        return False
+    if e_lfanew + 4 <= len(head):
+        return bytes(head[e_lfanew:e_lfanew + 4]) == b"PE\0\0"
+    return True
+
+
+def sniff_bytes(head):
+    """Returns (mime_type, category) for the first bytes of a file, or (None, None) if nothing matches."""
+    if len(head) < 4:
+        return None, None
+    start = bytes(head[:16])
+
+    if start.startswith(TEXT_BOMS):
+        return "text/plain", "text"
+
+    if start.startswith(b"%PDF-"):
+        return "application/pdf", "document"
+    if start.startswith(b"PK\x03\x04"):
+        return _sniff_zip(head)
+    if start.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png", "image"
+    if start.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg", "image"
+    if start.startswith((b"GIF87a", b"GIF89a")):
+        return "image/gif", "image"
+    if start.startswith(b"RIFF") and len(start) >= 12:
+        kind = start[8:12]
+        if kind == b"WAVE":
+            return "audio/wav", "audio"
+        if kind == b"AVI ":
+            return "video/x-msvideo", "video"
+        if kind == b"WEBP":
+            return "image/webp", "image"
+    if start[4:8] == b"ftyp":
+        return _sniff_iso_media(head)
+    if start.startswith(b"\x1aE\xdf\xa3"):
+        return "video/x-matroska", "video"
+    if start.startswith(b"ID3") or _is_mpeg_frame(start):
+        return "audio/mpeg", "audio"
+    if start.startswith(b"OggS"):
+        return "audio/ogg", "audio"
+    if start.startswith(b"fLaC"):
+        return "audio/flac", "audio"
+    if start.startswith(b"\x7fELF"):
+        return "application/x-executable", "program"
+    if start.startswith(b"MZ") and _is_pe_executable(head):
+        return "application/vnd.microsoft.portable-executable", "program"
+    if start.startswith(b"Rar!\x1a\x07"):
+        return "application/vnd.rar", "archive"
+    if start.startswith(b"7z\xbc\xaf\x27\x1c"):
+        return "application/x-7z-compressed", "archive"
+    if start.startswith(b"\x1f\x8b"):
+        return "application/gzip", "archive"
+
+    # No known signature: call it text if it has no NUL bytes and decodes as UTF-8
+    data = bytes(head)
+    if b"\0" not in data:
+        try:
+            data.decode("utf-8")
+            return "text/plain", "text"
+        except UnicodeDecodeError as e:
+            # A multi-byte character cut off at the end of the sample is still text
+            if e.start >= len(data) - 3:
+                return "text/plain", "text"
+    return None, None
+
+
+def sniff_file(file_path):
+    """Returns (mime_type, category) from the file's magic number, or (None, None)."""
+    try:
+        return sniff_bytes(_read_head(file_path))
+    except OSError:
+        return None, None
+
+
+def sniff_many(file_paths, max_workers=SNIFF_WORKERS):
+    """Sniffs many files over a thread pool. Returns {file_path: (mime_type, category)}."""
+    file_paths = list(file_paths)
+    if len(file_paths) < 2:
+        return {path: sniff_file(path) for path in file_paths}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(zip(file_paths, executor.map(sniff_file, file_paths)))
+
+
+def is_partial_download(file_name):
+    """True for in-progress downloads and copies such as "setup.exe.crdownload" or "movie.mkv.part"."""
+    return os.path.splitext(file_name)[1][1:].lower() in PARTIAL_DOWNLOAD_EXTENSIONS
+
+
+def needs_sniffing(file_name, category, default_category):
+    """True when the extension rules couldn't say what a file is. Partial downloads are never sniffed."""
+    if is_partial_download(file_name):
+        return False
+    if category == default_category:
+        return True
+    extension = os.path.splitext(file_name)[1][1:].lower()
+    return extension in GENERIC_EXTENSIONS
@@ -0,0 +1,227 @@
+import hashlib
+import os
+import threading
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src.backend.category_rules import get_rules
+from src.backend.content_sniffer import is_partial_download
+from src.backend.folder_categorizer import move_files_to_category_folder
+from src.io.extract_data import extract_many
+from src.io.processed_data import lookup_file_hashes, store_file_hashes
+
+# The cheap second pass hashes this much from each end of a file
+HEAD_TAIL_SIZE = 64 * 1024
+
+HASH_BUFFER_SIZE = 1024 * 1024
+HASH_WORKERS = 8
+
+QUARANTINE_FOLDER = "Duplicates"
+
+ACTIONS = ("hardlink", "skip", "quarantine")
+
+# paths[0] is the copy that is kept; the others are its duplicates
+DuplicateSet = namedtuple("DuplicateSet", ["content_hash", "size", "paths"])
+
+_local = threading.local()
+
+
+def _buffer():
+    buffer = getattr(_local, "buffer", None)
+    if buffer is None:
+        buffer = _local.buffer = bytearray(HASH_BUFFER_SIZE)
+    return buffer
+
+
+def partial_hash(file_path, size):
+    """BLAKE2 of the first and last HEAD_TAIL_SIZE bytes. For files up to twice that it covers everything."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, "rb", buffering=0) as f:
+        digest.update(f.read(HEAD_TAIL_SIZE))
+        if size > HEAD_TAIL_SIZE:
+            f.seek(max(HEAD_TAIL_SIZE, size - HEAD_TAIL_SIZE))
+            digest.update(f.read(HEAD_TAIL_SIZE))
+    return digest.hexdigest()
+
+
+def full_hash(file_path):
+    """Streaming BLAKE2 of the whole file through a buffer reused by the calling thread."""
+    digest = hashlib.blake2b(digest_size=20)
+    buffer = _buffer()
+    view = memoryview(buffer)
+    with open(file_path, "rb", buffering=0) as f:
+        while True:
+            read = f.readinto(buffer)
+            if not read:
+                break
+            digest.update(view[:read])
+    return digest.hexdigest()
+
+
+def _hash_all(function, jobs, max_workers):
+    """Runs function(*job) over a thread pool. Returns {job: hash}, leaving out files that couldn't be read."""
+    def run(job):
+        try:
+            return function(*job)
+        except OSError as e:
+            print(f"Error hashing {job[0]}: {e}")
+            return None
+
+    if len(jobs) < 2:
+        results = [run(job) for job in jobs]
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(run, jobs))
+    return {job: result for job, result in zip(jobs, results) if result is not None}
+
+
+def _keeper_order(path, mtime):
+    # Keep the plainest name ("report.pdf" over "report (1).pdf"), then the oldest copy
+    return len(os.path.basename(path)), mtime, path
+
+
+def _identify(paths):
+    """
+    {path: (device, inode, size, mtime)} from a full os.stat of each path. The DirEntry stats behind
+    extract_many report st_ino 0 on Windows, and inode numbers only mean something together with st_dev.
+    """
+    identities = {}
+    for path in paths:
+        try:
+            file_stat = os.stat(path)
+        except OSError as e:
+            print(f"Error reading metadata of {path}: {e}")
+            continue
+        identities[path] = (file_stat.st_dev, file_stat.st_ino, file_stat.st_size, file_stat.st_mtime)
+    return identities
+
+
+def _shared_sizes(sizes):
+    values, counts = np.unique(np.asarray(sizes, dtype=np.int64), return_counts=True)
+    return set(values[counts > 1].tolist())
+
+
+def find_duplicates(source, min_size=1, max_workers=HASH_WORKERS, rules=None, metadata=None):
+    """
+    Finds files with identical content in a directory (its files, not subfolders) or an iterable of paths.
+    metadata from extract_data.extract_many for the same files can be passed in to skip the directory scan.
+
+    Files are grouped by size first; only sizes shared by several files are hashed, first at the head and
+    tail, and only files that still collide there get a full content hash. Hashes are stored in the files
+    table keyed by (device, inode, size, mtime), so unchanged files are not read again on later runs.
+    Partial downloads are ignored. Returns a list of DuplicateSet, largest files first.
+    """
+    rules = rules or get_rules()
+    if metadata is None:
+        metadata = extract_many(source, rules=rules, sniff=False)
+    metadata = metadata[metadata["size"] >= min_size]
+    metadata = metadata[np.array([not is_partial_download(os.path.basename(path)) for path in metadata["path"]],
+                                 dtype=bool)]
+
+    # Hard links can only share a size, so only files of shared sizes need their real (device, inode)
+    sizes = _shared_sizes(metadata["size"])
+    categories = {path: category for path, size, category
+                  in zip(metadata["path"], metadata["size"], metadata["category"]) if size in sizes}
+    identities = _identify(categories)
+
+    # Paths that are already hard links of each other are one file; keep one path per (device, inode).
+    # Where the filesystem has no file ids (st_ino 0) every path counts as its own file
+    seen = set()
+    for path, (device, inode, _, _) in list(identities.items()):
+        if inode == 0:
+            continue
+        if (device, inode) in seen:
+            del identities[path]
+        seen.add((device, inode))
+    sizes = _shared_sizes([size for _, _, size, _ in identities.values()])
+    files = {path: (*identity, categories[path]) for path, identity in identities.items() if identity[2] in sizes}
+    if not files:
+        return []
+
+    # (device, inode, size, mtime) identifies unchanged content; without a real inode there is no cache key
+    cache_keys = {path: key[:4] for path, key in files.items() if key[1] != 0}
+    stored = lookup_file_hashes(cache_keys.values())
+    partial = {path: stored[key][0] for path, key in cache_keys.items() if key in stored}
+    full = {path: stored[key][1] for path, key in cache_keys.items() if key in stored and stored[key][1]}
+
+    missing = [(path, files[path][2]) for path in files if path not in partial]
+    partial.update((path, digest) for (path, _), digest in _hash_all(partial_hash, missing, max_workers).items())
+
+    groups = defaultdict(list)
+    for path, digest in partial.items():
+        groups[(files[path][2], digest)].append(path)
+
+    to_hash = []
+    for (size, _), paths in groups.items():
+        if len(paths) < 2:
+            continue
+        for path in paths:
+            if path in full:
+                continue
+            if size <= 2 * HEAD_TAIL_SIZE:
+                full[path] = partial[path]
+            else:
+                to_hash.append((path,))
+    full.update((path, digest) for (path,), digest in _hash_all(full_hash, to_hash, max_workers).items())
+
+    store_file_hashes([
+        (path, os.path.splitext(path)[1][1:].lower(), category, rules.get_color(category),
+         device if inode else None, inode or None, size, mtime, partial[path], full.get(path))
+        for path, (device, inode, size, mtime, category) in files.items() if path in partial
+    ])
+
+    by_content = defaultdict(list)
+    for path, digest in full.items():
+        by_content[(files[path][2], digest)].append(path)
+
+    duplicates = []
+    for (size, digest), paths in by_content.items():
+        if len(paths) > 1:
+            paths.sort(key=lambda path: _keeper_order(path, files[path][3]))
+            duplicates.append(DuplicateSet(digest, size, paths))
+    duplicates.sort(key=lambda duplicate: (-duplicate.size, duplicate.paths[0]))
+    return duplicates
+
+
+def _hardlink(keeper, duplicate):
+    # Link under a temporary name first, so the duplicate is only replaced once the link exists
+    temp_path = f"{duplicate}.smartsort-link"
+    os.link(keeper, temp_path)
+    try:
+        os.replace(temp_path, duplicate)
+    except OSError:
+        os.remove(temp_path)
+        raise
+
+
+def resolve_duplicates(duplicates, action="skip", quarantine_folder=None, dry_run=False):
+    """
+    Acts on the result of find_duplicates. Every set's first path is kept; the others are
+    - hardlink: replaced by hard links to the kept file (freeing their space, names stay in place)
+    - skip: left alone
+    - quarantine: moved into quarantine_folder (journaled, so the move can be rolled back)
+    Returns the set of duplicate paths, so callers like Organize can leave them out. With dry_run nothing is
+    linked or moved, but the same set is returned.
+    """
+    if action not in ACTIONS:
+        raise ValueError(f"Unknown duplicate action {action!r}, expected one of {ACTIONS}")
+
+    extra_paths = set()
+    for duplicate in duplicates:
+        keeper = duplicate.paths[0]
+        for path in duplicate.paths[1:]:
+            extra_paths.add(path)
+            if action == "hardlink" and not dry_run:
+                try:
+                    _hardlink(keeper, path)
+                except OSError as e:
+                    print(f"Error linking {path} to {keeper}: {e}")
+
+    if action == "quarantine" and extra_paths and not dry_run:
+        if quarantine_folder is None:
+            quarantine_folder = os.path.join(os.path.dirname(duplicates[0].paths[0]), QUARANTINE_FOLDER)
+        os.makedirs(quarantine_folder, exist_ok=True)
+        move_files_to_category_folder(sorted(extra_paths), quarantine_folder)
+    return extra_paths
@@ -1,49 +1,53 @@
+import os
+
+from src.backend.category_rules import get_rules
+from src.backend.content_sniffer import GENERIC_EXTENSIONS, needs_sniffing, sniff_file, sniff_many
+
+
 def categorize_file(file_name):
     """
-    Categorizes files based on their extensions.
-    Returns a category name (e.g., Documents, Media, etc.).
+    Categorizes files based on their extensions and the user's name rules.
+    Returns a category name (e.g. document, video, other) from the shared rule table in category_rules.json.
+    """
+    return get_rules().categorize(os.path.basename(file_name))
+
+
+def pick_category(file_name, rule_category, sniffed_category):
+    """Settles between the category from the rules and the one from sniffing the file's content."""
+    if sniffed_category is None:
+        return rule_category
+    # "Looks like text" is only trusted for files whose extension tells us nothing (.bin, no extension, ...);
+    # otherwise every unknown source or config file would be filed under text
+    if sniffed_category == "text" and os.path.splitext(file_name)[1][1:].lower() not in GENERIC_EXTENSIONS:
+        return rule_category
+    return sniffed_category
+
+
+def categorize_path(file_path, rules=None):
+    """
+    Categorizes a file on disk: the extension and name rules first, then the file's magic number
+    when the rules fall through to the default category or the extension is a generic one like .bin.
     """
-    if file_name.endswith(".pdf") or file_name.endswith(".docx") or file_name.endswith(".pptx"):
-        return "Documents"
-    elif file_name.endswith(".mp3") or file_name.endswith(".wav") or file_name(".aac"):
-        return"Media_Audio" 
-    elif file_name.endswith(".mp4") or file_name.endswith(".avi") or file_name(".mov"):
-        return "Media_Video"
-    elif file_name.endswith(".jpg") or file_name.endswith(".png") or file_name.endswith(".jpeg") or file_name.endswith(".gif"):
-        return "Images"
-    elif file_name.endswith(".txt") or file_name.endswith(".csv") or file_name.endswith(".log"):
-        return "Text"
-    else:
-        return "Others"
-    
-    
-
-    '''
-    
-    files_extentions = [".pdf", ".docx", ".pptx", ".mp3", ".wav", ".aac" , ".mp4", ".avi" , ".mov", ".jpg", ".png", ".jpeg", ".gif", ".txt", ".csv", ".log"]
-
-    index = 0
-
-    for index in range(files_extentions.len)
-        if file_name.endswith(files_extentions[index]).equals(files_extentions[0] or files_extentions[1] or files_extentions[2]):
-            return "Documents"
-        
-        elif file_name.endswith(files_extentions[index]).equals(files_extentions[3] or files_extentions[4] or files_extentions[5]):
-            return "Media_Audio"
-
-        elif file_name.endswith(files_extentions[index]).equals(files_extentions[6] or files_extentions[7] or files_extentions[8]):
-            return "Media_Video"
-
-        elif file_name.endswith(files_extentions[index]).equals(files_extentions[9] or files_extentions[10] or files_extentions[11] or files_extentions[12]):
-            return "Images"
-        
-        elif file_name.endswith(files_extentions[index]).equals(files_extentions[13] or files_extentions[14] or files_extentions[15]):
-            return "Text"
-
-        else:
-            return "Others"
-        
-        
-    
-    
-    '''
\ No newline at end of file
+    rules = rules or get_rules()
+    file_name = os.path.basename(file_path)
+    category = rules.categorize(file_name)
+    if needs_sniffing(file_name, category, rules.default_category):
+        category = pick_category(file_name, category, sniff_file(file_path)[1])
+    return category
+
+
+def categorize_paths(file_paths, rules=None):
+    """Like categorize_path for many files; the files that need sniffing are read over a thread pool."""
+    rules = rules or get_rules()
+    categories = {}
+    unresolved = []
+    for file_path in file_paths:
+        file_name = os.path.basename(file_path)
+        category = rules.categorize(file_name)
+        categories[file_path] = category
+        if needs_sniffing(file_name, category, rules.default_category):
+            unresolved.append(file_path)
+
+    for file_path, (_, sniffed_category) in sniff_many(unresolved).items():
+        categories[file_path] = pick_category(os.path.basename(file_path), categories[file_path], sniffed_category)
+    return categories
@@ -0,0 +1,316 @@
+import argparse
+import os
+import sqlite3
+import time
+
+# The index lives next to ai_file_results_test.db (both are relative to the working directory)
+INDEX_DATABASE = "file_index.db"
+
+# Rows are written in batches so a full build stays in a handful of transactions
+INSERT_BATCH_SIZE = 5000
+
+
+def get_index_connection(db_path=INDEX_DATABASE):
+    """Create and return a connection to the filename index."""
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    create_index_schema(conn)
+    return conn
+
+
+def has_trigram_support(conn):
+    """Return True if this SQLite build ships FTS5 with the trigram tokenizer."""
+    row = conn.execute("SELECT value FROM index_meta WHERE key = 'fts'").fetchone()
+    return row is not None and row[0] == "trigram"
+
+
+def create_index_schema(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS entries (
+                        id INTEGER PRIMARY KEY,
+                        path TEXT NOT NULL UNIQUE,
+                        name TEXT NOT NULL,
+                        name_lower TEXT NOT NULL,
+                        mtime REAL,
+                        size INTEGER
+                    )''')
+    conn.execute("CREATE INDEX IF NOT EXISTS entries_name_lower ON entries (name_lower)")
+    conn.execute("CREATE TABLE IF NOT EXISTS index_meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    if conn.execute("SELECT 1 FROM index_meta WHERE key = 'fts'").fetchone():
+        return
+
+    # Substring search uses an FTS5 trigram table; older SQLite builds fall back to LIKE scans
+    try:
+        conn.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts
+                        USING fts5(name_lower, content='entries', content_rowid='id', tokenize='trigram')''')
+        conn.executescript('''
+            CREATE TRIGGER IF NOT EXISTS entries_ai AFTER INSERT ON entries BEGIN
+                INSERT INTO entries_fts (rowid, name_lower) VALUES (new.id, new.name_lower);
+            END;
+            CREATE TRIGGER IF NOT EXISTS entries_ad AFTER DELETE ON entries BEGIN
+                INSERT INTO entries_fts (entries_fts, rowid, name_lower) VALUES ('delete', old.id, old.name_lower);
+            END;
+            CREATE TRIGGER IF NOT EXISTS entries_au AFTER UPDATE OF name_lower ON entries BEGIN
+                INSERT INTO entries_fts (entries_fts, rowid, name_lower) VALUES ('delete', old.id, old.name_lower);
+                INSERT INTO entries_fts (rowid, name_lower) VALUES (new.id, new.name_lower);
+            END;
+        ''')
+        fts = "trigram"
+    except sqlite3.OperationalError:
+        fts = "none"
+    conn.execute("INSERT OR REPLACE INTO index_meta (key, value) VALUES ('fts', ?)", (fts,))
+    conn.commit()
+
+
+def _entry_row(path, name, stat_result):
+    return path, name, name.lower(), stat_result.st_mtime, stat_result.st_size
+
+
+def scan_tree(root):
+    """
+    Walks root with os.scandir and yields (path, name, name_lower, mtime, size) for every file.
+    Unreadable directories are skipped, symlinked directories are not followed.
+    """
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file():
+                            yield _entry_row(entry.path, entry.name, entry.stat())
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+
+
+def build_index(root=None, db_path=INDEX_DATABASE):
+    """
+    Rebuilds the filename index from scratch for everything under root (defaults to the home directory).
+    Returns the number of files indexed.
+    """
+    root = os.path.abspath(root or os.path.expanduser("~"))
+    start = time.perf_counter()
+
+    with get_index_connection(db_path) as conn:
+        # Dropping and recreating is much cheaper than deleting every row through the FTS triggers
+        conn.executescript('''
+            DROP TRIGGER IF EXISTS entries_ai;
+            DROP TRIGGER IF EXISTS entries_ad;
+            DROP TRIGGER IF EXISTS entries_au;
+            DROP TABLE IF EXISTS entries_fts;
+            DROP TABLE IF EXISTS entries;
+            DELETE FROM index_meta;
+        ''')
+        create_index_schema(conn)
+
+        count = 0
+        batch = []
+        for row in scan_tree(root):
+            batch.append(row)
+            if len(batch) >= INSERT_BATCH_SIZE:
+                conn.executemany('''INSERT OR REPLACE INTO entries (path, name, name_lower, mtime, size)
+                                    VALUES (?, ?, ?, ?, ?)''', batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            conn.executemany('''INSERT OR REPLACE INTO entries (path, name, name_lower, mtime, size)
+                                VALUES (?, ?, ?, ?, ?)''', batch)
+            count += len(batch)
+
+        conn.execute("INSERT OR REPLACE INTO index_meta (key, value) VALUES ('root', ?)", (root,))
+        conn.execute("INSERT OR REPLACE INTO index_meta (key, value) VALUES ('built_at', ?)", (str(time.time()),))
+        conn.commit()
+
+    print(f"Indexed {count} files under {root} in {time.perf_counter() - start:.2f}s")
+    return count
+
+
+def _subtree_clause(column="path"):
+    # Matches a path itself and everything below it without LIKE, so % and _ in names are harmless
+    return f"({column} = ? OR substr({column}, 1, ?) = ?)"
+
+
+def _subtree_params(path):
+    prefix = path.rstrip(os.sep) + os.sep
+    return path, len(prefix), prefix
+
+
+def add_entries(paths, db_path=INDEX_DATABASE):
+    """Adds or refreshes index entries for the given paths. Directories are indexed recursively."""
+    rows = []
+    for path in paths:
+        try:
+            if os.path.isdir(path) and not os.path.islink(path):
+                rows.extend(scan_tree(path))
+            else:
+                rows.append(_entry_row(path, os.path.basename(path), os.stat(path)))
+        except OSError:
+            continue
+
+    if not rows:
+        return 0
+    with get_index_connection(db_path) as conn:
+        conn.executemany('''INSERT INTO entries (path, name, name_lower, mtime, size) VALUES (?, ?, ?, ?, ?)
+                            ON CONFLICT(path) DO UPDATE SET mtime = excluded.mtime, size = excluded.size''', rows)
+        conn.commit()
+    return len(rows)
+
+
+def remove_entries(paths, db_path=INDEX_DATABASE):
+    """Removes the given paths, and anything indexed below them, from the index."""
+    with get_index_connection(db_path) as conn:
+        for path in paths:
+            conn.execute(f"DELETE FROM entries WHERE {_subtree_clause()}", _subtree_params(path))
+        conn.commit()
+
+
+def move_entries(moves, db_path=INDEX_DATABASE):
+    """Applies (old_path, new_path) renames to the index, including everything indexed below old_path."""
+    with get_index_connection(db_path) as conn:
+        for old_path, new_path in moves:
+            name = os.path.basename(new_path)
+            conn.execute("DELETE FROM entries WHERE path = ?", (new_path,))
+            conn.execute("UPDATE entries SET path = ?, name = ?, name_lower = ? WHERE path = ?",
+                         (new_path, name, name.lower(), old_path))
+            old_prefix = old_path.rstrip(os.sep) + os.sep
+            conn.execute("UPDATE entries SET path = ? || substr(path, ?) WHERE substr(path, 1, ?) = ?",
+                         (new_path.rstrip(os.sep) + os.sep, len(old_prefix) + 1, len(old_prefix), old_prefix))
+        conn.commit()
+
+
+def load_snapshot(root, db_path=INDEX_DATABASE):
+    """Returns {path: (mtime, size)} for every indexed file under root."""
+    with get_index_connection(db_path) as conn:
+        rows = conn.execute(f"SELECT path, mtime, size FROM entries WHERE {_subtree_clause()}", _subtree_params(root))
+        return {path: (mtime, size) for path, mtime, size in rows}
+
+
+def get_index_root(db_path=INDEX_DATABASE):
+    """Return the root the index was built for, or None if it has never been built."""
+    with get_index_connection(db_path) as conn:
+        row = conn.execute("SELECT value FROM index_meta WHERE key = 'root'").fetchone()
+        return row[0] if row else None
+
+
+def _fts_phrase(text):
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _escape_like(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def search_index(query, mode="substring", limit=None, db_path=INDEX_DATABASE):
+    """
+    Yields indexed file paths whose name matches query (case-insensitive).
+
+    mode is one of:
+        "substring" - the name contains query
+        "prefix"    - the name starts with query
+        "trigram"   - fuzzy match, names sharing the most trigrams with query come first
+    """
+    query = query.lower()
+    if not query:
+        return
+
+    conn = get_index_connection(db_path)
+    try:
+        trigram = has_trigram_support(conn)
+
+        if mode == "prefix":
+            # Range scan over the name_lower index instead of LIKE, which SQLite can't index case-insensitively
+            sql = "SELECT path FROM entries WHERE name_lower >= ? AND name_lower < ? ORDER BY name_lower"
+            params = [query, query + "\U0010ffff"]
+        elif mode == "trigram" and trigram and len(query) >= 3:
+            sql = '''SELECT entries.path FROM entries_fts JOIN entries ON entries.id = entries_fts.rowid
+                     WHERE entries_fts MATCH ? ORDER BY entries_fts.rank'''
+            params = [" OR ".join(_fts_phrase(t) for t in sorted(_trigrams(query)))]
+        elif mode in ("substring", "trigram") and trigram and len(query) >= 3:
+            sql = '''SELECT entries.path FROM entries_fts JOIN entries ON entries.id = entries_fts.rowid
+                     WHERE entries_fts MATCH ?'''
+            params = [_fts_phrase(query)]
+        elif mode in ("substring", "trigram"):
+            # Queries shorter than a trigram (or no FTS5) scan the name column
+            sql = "SELECT path FROM entries WHERE name_lower LIKE ? ESCAPE '\\'"
+            params = ["%" + _escape_like(query) + "%"]
+        else:
+            raise ValueError(f"Unknown search mode: {mode}")
+
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        for (path,) in conn.execute(sql, params):
+            yield path
+    finally:
+        conn.close()
+
+
+def verify_index(root=None, db_path=INDEX_DATABASE):
+    """
+    Compares the index against the filesystem under root.
+    Returns a dict with the paths that are indexed but gone ("missing"), on disk but not indexed ("unindexed")
+    and indexed with an outdated mtime or size ("stale").
+    """
+    root = os.path.abspath(root or get_index_root(db_path) or os.path.expanduser("~"))
+
+    # Only entries under root are compared; the rest of the index isn't part of the walk
+    indexed = load_snapshot(root, db_path)
+
+    unindexed = []
+    stale = []
+    for path, _, _, mtime, size in scan_tree(root):
+        known = indexed.pop(path, None)
+        if known is None:
+            unindexed.append(path)
+        elif known != (mtime, size):
+            stale.append(path)
+
+    return {"missing": sorted(indexed), "unindexed": unindexed, "stale": stale}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the Smart Sort filename index.")
+    parser.add_argument("--db", default=INDEX_DATABASE, help="Path of the index database")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    rebuild_parser = subparsers.add_parser("rebuild", help="Rebuild the index from scratch")
+    rebuild_parser.add_argument("root", nargs="?", help="Directory to index (defaults to the home directory)")
+
+    verify_parser = subparsers.add_parser("verify", help="Compare the index with the filesystem")
+    verify_parser.add_argument("root", nargs="?", help="Directory to verify (defaults to the indexed root)")
+
+    search_parser = subparsers.add_parser("search", help="Query the index")
+    search_parser.add_argument("query")
+    search_parser.add_argument("--mode", choices=["substring", "prefix", "trigram"], default="substring")
+    search_parser.add_argument("--limit", type=int, default=50)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "rebuild":
+        build_index(args.root, args.db)
+    elif args.command == "verify":
+        report = verify_index(args.root, args.db)
+        for key in ("missing", "unindexed", "stale"):
+            print(f"{key}: {len(report[key])}")
+            for path in report[key][:20]:
+                print(f"    {path}")
+        return 1 if any(report.values()) else 0
+    elif args.command == "search":
+        for path in search_index(args.query, args.mode, args.limit, args.db):
+            print(path)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
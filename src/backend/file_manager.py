@@ -1,7 +1,167 @@
+import errno
+import hashlib
 import os
 import shutil
+import threading
 
-def move_file(src_path, dest_folder):
+# Buffer used when the OS has no zero-copy primitive for file-to-file copies
+COPY_BUFFER_SIZE = 8 * 1024 * 1024
+
+# Zero-copy calls are issued in chunks of this size so progress can be reported along the way
+ZERO_COPY_CHUNK_SIZE = 64 * 1024 * 1024
+
+# How many cross-device copies may write to the same destination device at once
+MAX_COPIES_PER_DEVICE = 2
+
+_device_slots = {}
+_device_slots_lock = threading.Lock()
+
+
+def _device_slot(device):
+    with _device_slots_lock:
+        slot = _device_slots.get(device)
+        if slot is None:
+            slot = _device_slots[device] = threading.BoundedSemaphore(MAX_COPIES_PER_DEVICE)
+        return slot
+
+
+def _file_digest(path):
+    digest = hashlib.blake2b()
+    buffer = bytearray(COPY_BUFFER_SIZE)
+    view = memoryview(buffer)
+    with open(path, "rb") as f:
+        while True:
+            read = f.readinto(buffer)
+            if not read:
+                break
+            digest.update(view[:read])
+    return digest.hexdigest()
+
+
+def _copy_contents(src_file, dst_file, total, progress):
+    """Copies an open file to another, zero-copy where the OS supports it. Calls progress(copied, total)."""
+    src_fd, dst_fd = src_file.fileno(), dst_file.fileno()
+    copied = 0
+
+    # copy_file_range (Linux) and sendfile (Linux allows file-to-file) keep the data in the kernel
+    for zero_copy in ("copy_file_range", "sendfile"):
+        if not hasattr(os, zero_copy) or copied:
+            continue
+        try:
+            while copied < total:
+                if zero_copy == "copy_file_range":
+                    sent = os.copy_file_range(src_fd, dst_fd, min(total - copied, ZERO_COPY_CHUNK_SIZE))
+                else:
+                    sent = os.sendfile(dst_fd, src_fd, copied, min(total - copied, ZERO_COPY_CHUNK_SIZE))
+                if sent == 0:
+                    break
+                copied += sent
+                if progress is not None:
+                    progress(copied, total)
+            if copied >= total:
+                return copied
+        except OSError:
+            if copied:
+                raise
+            # Unsupported between these filesystems, try the next method
+
+    buffer = bytearray(COPY_BUFFER_SIZE)
+    view = memoryview(buffer)
+    src_file.seek(copied)
+    dst_file.seek(copied)
+    while True:
+        read = src_file.readinto(buffer)
+        if not read:
+            break
+        dst_file.write(view[:read])
+        copied += read
+        if progress is not None:
+            progress(copied, total)
+    return copied
+
+
+def copy_file(src_path, dest_path, progress=None, verify=False):
+    """
+    Copies src_path to dest_path through a temporary file that is renamed into place once complete,
+    so an interrupted copy never leaves a truncated file under the final name.
+    With verify=True both files are hashed with BLAKE2 afterwards and a mismatch raises OSError.
+    """
+    temp_path = dest_path + ".smartsort-part"
+    total = os.path.getsize(src_path)
+    try:
+        with open(src_path, "rb") as src_file, open(temp_path, "wb") as dst_file:
+            _copy_contents(src_file, dst_file, total, progress)
+        shutil.copystat(src_path, temp_path)
+        if verify and _file_digest(src_path) != _file_digest(temp_path):
+            raise OSError(f"Checksum mismatch copying {src_path} to {dest_path}")
+        os.replace(temp_path, dest_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def _rename_no_replace(src_path, dest_path):
+    """
+    Renames src_path to dest_path on the same device, raising FileExistsError instead of replacing a file
+    that is already there. A hard link followed by an unlink never replaces anything; where links aren't
+    available (folders, symlinks, FAT and some network shares) the existence check and rename are separate steps.
+    """
+    if not os.path.isdir(src_path) and not os.path.islink(src_path):
+        try:
+            os.link(src_path, dest_path)
+        except FileExistsError:
+            raise
+        except OSError:
+            pass
+        else:
+            os.unlink(src_path)
+            return
+    if os.path.lexists(dest_path):
+        raise FileExistsError(errno.EEXIST, "Destination path already exists", dest_path)
+    os.rename(src_path, dest_path)
+
+
+def move_to_path(src_path, dest_path, progress=None, verify=False):
+    """
+    Moves src_path to exactly dest_path. Raises FileExistsError if dest_path already exists; nothing is
+    ever overwritten.
+    Moves on the same device are a rename. Moves to another device (an external disk, a NAS share) first
+    claim dest_path with an exclusive create, then stream the data with copy_file, limited to
+    MAX_COPIES_PER_DEVICE at a time per destination device, and only remove the source once the copy is complete.
+    progress(bytes_copied, total_bytes) is called while copying.
+    """
+    dest_dir = os.path.dirname(dest_path) or "."
+    if os.stat(src_path).st_dev == os.stat(dest_dir).st_dev:
+        _rename_no_replace(src_path, dest_path)
+        if progress is not None and os.path.isfile(dest_path):
+            size = os.path.getsize(dest_path)
+            progress(size, size)
+        return dest_path
+
+    if os.path.isdir(src_path) and not os.path.islink(src_path):
+        # Whole folders are rare here; let shutil walk them
+        if os.path.lexists(dest_path):
+            raise FileExistsError(errno.EEXIST, "Destination path already exists", dest_path)
+        with _device_slot(os.stat(dest_dir).st_dev):
+            shutil.move(src_path, dest_path)
+        return dest_path
+
+    # The empty placeholder keeps anything else from taking the name while the copy runs;
+    # copy_file then replaces it with the finished file
+    os.close(os.open(dest_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644))
+    try:
+        with _device_slot(os.stat(dest_dir).st_dev):
+            copy_file(src_path, dest_path, progress, verify)
+    except BaseException:
+        if os.path.exists(dest_path) and os.path.getsize(dest_path) == 0:
+            os.remove(dest_path)
+        raise
+    os.remove(src_path)
+    return dest_path
+
+
+def move_file(src_path, dest_folder, progress=None, verify=False):
     """
     Moves a file from src_path to dest_folder.
     Creates the destination folder if it doesn't exist.
@@ -9,7 +169,9 @@ def move_file(src_path, dest_folder):
     try:
         if not os.path.exists(dest_folder):
             os.makedirs(dest_folder)
-        shutil.move(src_path, dest_folder)
+        dest_path = move_to_path(src_path, os.path.join(dest_folder, os.path.basename(src_path)), progress, verify)
         print(f"Moved file {src_path} to {dest_folder}")
+        return dest_path
     except Exception as e:
-        print(f"Error moving file: {e}")
\ No newline at end of file
+        print(f"Error moving file: {e}")
+        return None
@@ -1,7 +1,14 @@
 import os
 
-def search_files(keyword):
-    for root, dirs, files in os.walk(os.path.expanduser("~")):
-        for file in files:
-            if keyword in file:
-                yield os.path.join(root, file)
\ No newline at end of file
+from src.backend.file_index import build_index, get_index_root, search_index
+
+
+def search_files(keyword, mode="substring"):
+    """
+    Yields paths of files under the home directory whose name contains keyword.
+    Queries the persistent filename index, building it on first use.
+    """
+    if get_index_root() is None:
+        build_index(os.path.expanduser("~"))
+
+    yield from search_index(keyword, mode)
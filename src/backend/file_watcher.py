@@ -0,0 +1,402 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from src.backend.file_index import add_entries, remove_entries, move_entries, load_snapshot, scan_tree
+from src.io.processed_data import remove_files_by_file_path, move_file_path
+
+# kind is one of "created", "deleted", "moved", "modified"; src_path is only set for moves
+FileEvent = namedtuple("FileEvent", ["kind", "path", "src_path"])
+
+# inotify constants from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0x00000800
+IN_CLOEXEC = 0x00080000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_ONLYDIR
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def get_default_watch_folders():
+    """The folders watched when none are configured."""
+    return [os.path.join(os.path.expanduser("~"), "Downloads")]
+
+
+class EventCoalescer:
+    """
+    Collects raw events and merges them per path until the burst has been quiet for debounce seconds.
+    A browser download (create temp file, write, rename to the final name) collapses into one "created" event,
+    and a temp file that is created and deleted again produces nothing at all.
+    """
+
+    def __init__(self, debounce=1.0, max_delay=10.0):
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.pending = OrderedDict()
+        self.first_event_time = None
+        self.last_event_time = None
+
+    def add(self, event, now=None):
+        now = time.monotonic() if now is None else now
+        if self.first_event_time is None:
+            self.first_event_time = now
+        self.last_event_time = now
+
+        previous = self.pending.pop(event.path, None)
+
+        if event.kind == "modified":
+            # A write doesn't change what happened to the path, only that its contents moved on
+            self.pending[event.path] = previous or event
+
+        elif event.kind == "created":
+            if previous is not None and previous.kind == "deleted":
+                self.pending[event.path] = FileEvent("modified", event.path, None)
+            else:
+                self.pending[event.path] = event
+
+        elif event.kind == "deleted":
+            if previous is None or previous.kind == "modified":
+                self.pending[event.path] = event
+            elif previous.kind == "moved":
+                # The file we knew about is the move's source, and that is what disappeared
+                self.pending[previous.src_path] = FileEvent("deleted", previous.src_path, None)
+            # created + deleted: a temp file that never needs to be seen
+
+        elif event.kind == "moved":
+            source = self.pending.pop(event.src_path, None)
+            if source is None or source.kind == "modified":
+                self.pending[event.path] = event
+            elif source.kind == "created":
+                self.pending[event.path] = FileEvent("created", event.path, None)
+            elif source.kind == "moved":
+                if source.src_path == event.path:
+                    # Renamed back to where it started
+                    self.pending[event.path] = FileEvent("modified", event.path, None)
+                else:
+                    self.pending[event.path] = FileEvent("moved", event.path, source.src_path)
+            else:
+                self.pending[event.path] = event
+
+    def ready(self, now=None):
+        """Return True once the pending burst should be flushed."""
+        if not self.pending:
+            return False
+        now = time.monotonic() if now is None else now
+        return now - self.last_event_time >= self.debounce or now - self.first_event_time >= self.max_delay
+
+    def flush(self):
+        events = list(self.pending.values())
+        self.pending.clear()
+        self.first_event_time = None
+        self.last_event_time = None
+        return events
+
+
+def apply_events(events):
+    """Feeds coalesced events into the filename index and the processed_data DB."""
+    created = [event.path for event in events if event.kind in ("created", "modified")]
+    deleted = [event.path for event in events if event.kind == "deleted"]
+    moved = [(event.src_path, event.path) for event in events if event.kind == "moved"]
+
+    if deleted:
+        remove_entries(deleted)
+        for path in deleted:
+            remove_files_by_file_path(path)
+    if moved:
+        move_entries(moved)
+        for old_path, new_path in moved:
+            move_file_path(old_path, new_path)
+    if created:
+        add_entries(created)
+
+
+class InotifyBackend:
+    """Recursive watches on Linux through inotify, loaded with ctypes so there is no extra dependency."""
+
+    def __init__(self, roots):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        self.watches = {}  # wd -> directory path
+        for root in roots:
+            self.watch_tree(root)
+
+    def watch_directory(self, path):
+        wd = self._add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            print(f"Could not watch {path}: {os.strerror(error)}")
+            return
+        self.watches[wd] = path
+
+    def watch_tree(self, root):
+        # Only directories are visited here, files are never listed
+        self.watch_directory(root)
+        for directory, dirs, _ in os.walk(root):
+            for name in dirs:
+                self.watch_directory(os.path.join(directory, name))
+
+    def _rewatch_moved_tree(self, old_path, new_path):
+        old_prefix = old_path + os.sep
+        for wd, path in list(self.watches.items()):
+            if path == old_path:
+                self.watches[wd] = new_path
+            elif path.startswith(old_prefix):
+                self.watches[wd] = new_path + path[len(old_path):]
+
+    def poll(self, timeout):
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+
+        try:
+            buffer = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        moved_from = {}  # cookie -> (path, is_dir)
+        offset = 0
+        while offset < len(buffer):
+            wd, mask, cookie, length = EVENT_HEADER.unpack_from(buffer, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(buffer[offset:offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                print("inotify queue overflowed, some events were lost")
+                continue
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+
+            directory = self.watches.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name)
+            is_dir = bool(mask & IN_ISDIR)
+
+            if mask & IN_CREATE:
+                if is_dir:
+                    self.watch_tree(path)
+                events.append(FileEvent("created", path, None))
+            elif mask & IN_CLOSE_WRITE:
+                events.append(FileEvent("modified", path, None))
+            elif mask & IN_DELETE:
+                events.append(FileEvent("deleted", path, None))
+            elif mask & IN_MOVED_FROM:
+                moved_from[cookie] = (path, is_dir)
+            elif mask & IN_MOVED_TO:
+                source = moved_from.pop(cookie, None)
+                if source is None:
+                    # Moved in from outside the watched tree
+                    if is_dir:
+                        self.watch_tree(path)
+                    events.append(FileEvent("created", path, None))
+                else:
+                    if is_dir:
+                        self._rewatch_moved_tree(source[0], path)
+                    events.append(FileEvent("moved", path, source[0]))
+
+        # A MOVED_FROM without its MOVED_TO left the watched tree
+        for path, is_dir in moved_from.values():
+            events.append(FileEvent("deleted", path, None))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingBackend:
+    """
+    Fallback for platforms without inotify. Keeps a {path: (mtime, size)} snapshot, seeded from the filename index
+    so changes made while the app was closed are picked up, and only relists directories whose mtime changed.
+    Writing to a file doesn't touch its directory's mtime, so the other files in the snapshot are re-stat'ed on
+    every poll to catch in-place modifications.
+    """
+
+    def __init__(self, roots, interval=2.0):
+        self.roots = roots
+        self.interval = interval
+        self.snapshot = {}
+        self.directory_mtimes = {}
+        for root in roots:
+            self.snapshot.update(load_snapshot(root))
+        self.pending_events = self._full_scan()
+
+    def _full_scan(self):
+        current = {}
+        for root in self.roots:
+            for path, _, _, mtime, size in scan_tree(root):
+                current[path] = (mtime, size)
+            for directory, _, _ in os.walk(root):
+                try:
+                    self.directory_mtimes[directory] = os.stat(directory).st_mtime
+                except OSError:
+                    continue
+        return self._diff(self.snapshot, current, replace_all=True)
+
+    def _diff(self, previous, current, replace_all=False):
+        created = [path for path in current if path not in previous]
+        deleted = [path for path in previous if path not in current]
+        modified = [path for path in current if path in previous and previous[path] != current[path]]
+
+        # Pair deletes and creates with an identical (mtime, size) into moves
+        deleted_by_stat = {}
+        for path in deleted:
+            deleted_by_stat.setdefault(previous[path], []).append(path)
+
+        events = []
+        for path in created:
+            candidates = deleted_by_stat.get(current[path])
+            if candidates:
+                events.append(FileEvent("moved", path, candidates.pop()))
+            else:
+                events.append(FileEvent("created", path, None))
+        for paths in deleted_by_stat.values():
+            events.extend(FileEvent("deleted", path, None) for path in paths)
+        events.extend(FileEvent("modified", path, None) for path in modified)
+
+        if replace_all:
+            self.snapshot = current
+        else:
+            for path in deleted:
+                self.snapshot.pop(path, None)
+            self.snapshot.update(current)
+        return events
+
+    def _scan_changed_directories(self):
+        changed = []
+        for directory, mtime in list(self.directory_mtimes.items()):
+            try:
+                current_mtime = os.stat(directory).st_mtime
+            except OSError:
+                current_mtime = None
+            if current_mtime != mtime:
+                changed.append(directory)
+                if current_mtime is None:
+                    del self.directory_mtimes[directory]
+                else:
+                    self.directory_mtimes[directory] = current_mtime
+
+        previous = {}
+        current = {}
+        for directory in changed:
+            previous.update((path, stat) for path, stat in self.snapshot.items() if os.path.dirname(path) == directory)
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if entry.path not in self.directory_mtimes:
+                                    self.directory_mtimes[entry.path] = entry.stat().st_mtime
+                                    for path, _, _, mtime, size in scan_tree(entry.path):
+                                        current[path] = (mtime, size)
+                            elif entry.is_file():
+                                stat_result = entry.stat()
+                                current[entry.path] = (stat_result.st_mtime, stat_result.st_size)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+
+        # Diffing all changed directories together lets a move between two of them pair up
+        return self._diff(previous, current) + self._stat_unchanged_files(set(changed))
+
+    def _stat_unchanged_files(self, relisted):
+        """Re-stats the snapshot's files outside the relisted directories and reports the ones that changed."""
+        events = []
+        for path, known in list(self.snapshot.items()):
+            if os.path.dirname(path) in relisted:
+                continue
+            try:
+                stat_result = os.stat(path)
+            except OSError:
+                # Deleted: its directory's mtime changed too, so the next relist reports it
+                continue
+            current = (stat_result.st_mtime, stat_result.st_size)
+            if current != known:
+                self.snapshot[path] = current
+                events.append(FileEvent("modified", path, None))
+        return events
+
+    def poll(self, timeout):
+        if self.pending_events:
+            events, self.pending_events = self.pending_events, []
+            return events
+        time.sleep(min(timeout, self.interval))
+        return self._scan_changed_directories()
+
+    def close(self):
+        pass
+
+
+class FileWatcher:
+    """
+    Watches folders in a background thread and keeps the filename index and processed_data DB in sync.
+    on_events, if given, is called with each coalesced batch after it has been applied.
+    """
+
+    def __init__(self, roots=None, debounce=1.0, on_events=None, use_inotify=None):
+        self.roots = [os.path.abspath(root) for root in (roots or get_default_watch_folders()) if os.path.isdir(root)]
+        self.coalescer = EventCoalescer(debounce)
+        self.on_events = on_events
+        self.use_inotify = sys.platform.startswith("linux") if use_inotify is None else use_inotify
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _create_backend(self):
+        if self.use_inotify:
+            try:
+                return InotifyBackend(self.roots)
+            except (OSError, AttributeError) as e:
+                print(f"inotify unavailable, falling back to polling: {e}")
+        return PollingBackend(self.roots)
+
+    def start(self):
+        if self._thread is None and self.roots:
+            self._thread = threading.Thread(target=self.run, name="FileWatcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def run(self):
+        backend = self._create_backend()
+        try:
+            while not self._stop.is_set():
+                for event in backend.poll(self.coalescer.debounce / 4):
+                    self.coalescer.add(event)
+                if self.coalescer.ready():
+                    events = self.coalescer.flush()
+                    try:
+                        apply_events(events)
+                        if self.on_events is not None:
+                            self.on_events(events)
+                    except Exception as e:
+                        print(f"Error applying file events: {e}")
+        finally:
+            backend.close()
@@ -1,37 +1,147 @@
 import os
-import shutil
+import uuid
+
+from src.backend.file_manager import move_to_path
+from src.backend.os_detection import is_case_insensitive
+from src.io.processed_data import (journal_moves, set_journal_state, get_journal_entries,
+                                   get_incomplete_batches, move_file_path)
+
+# Journal states are flushed in groups; resume_moves re-checks the filesystem for anything not yet flushed
+JOURNAL_FLUSH_SIZE = 100
+
+
+def plan_destination_paths(file_paths, dest_folder):
+    """
+    Picks a destination path for every source, appending _N before the extension on collisions.
+    The destination folder is listed once; no per-file existence probes are made. On case-insensitive
+    filesystems names that differ only in case collide too.
+    """
+    try:
+        existing = os.listdir(dest_folder)
+    except FileNotFoundError:
+        existing = []
+    fold = str.casefold if is_case_insensitive(dest_folder) else str
+    taken = {fold(name) for name in existing}
+
+    next_counter = {}  # (base, ext) -> first _N suffix worth trying
+    destinations = []
+    for src_path in file_paths:
+        filename = os.path.basename(src_path)
+        if fold(filename) in taken:
+            base, ext = os.path.splitext(filename)
+            key = (fold(base), fold(ext))
+            counter = next_counter.get(key, 1)
+            while fold(f"{base}_{counter}{ext}") in taken:
+                counter += 1
+            next_counter[key] = counter + 1
+            filename = f"{base}_{counter}{ext}"
+        taken.add(fold(filename))
+        destinations.append(os.path.join(dest_folder, filename))
+    return destinations
+
+
+def _run_journaled_moves(entries):
+    """Moves (journal_id, src_path, dest_path) entries, recording each outcome in the journal."""
+    done = []
+    failed = []
+    for journal_id, src_path, dest_path in entries:
+        try:
+            move_to_path(src_path, dest_path)
+            move_file_path(src_path, dest_path)
+            print(f"Moved file {src_path} to {dest_path}")
+            done.append(journal_id)
+        except Exception as e:
+            print(f"Error moving file: {e}")
+            failed.append(journal_id)
+
+        if len(done) >= JOURNAL_FLUSH_SIZE:
+            set_journal_state(done, "done")
+            done = []
+
+    set_journal_state(done, "done")
+    set_journal_state(failed, "failed")
+
 
 # Helper function to move multiple files to the appropriate category folder
 def move_files_to_category_folder(file_paths, dest_folder):
+    """
+    Moves files into dest_folder as one journaled batch and returns the batch id.
+    Every planned move is written to the move journal before the first file moves, so a batch that was
+    interrupted can be finished with resume_moves or undone with rollback_moves.
+    """
     # Create the destination directory if it doesn't exist
-    if not os.path.exists(dest_folder):
-        os.makedirs(dest_folder)  # Create the directory if it doesn't exist
+    os.makedirs(dest_folder, exist_ok=True)
 
+    sources = []
     for src_path in file_paths:
+        # Ensure the source file exists before trying to move it
+        if not os.path.exists(src_path):
+            print(f"Source file not found: {src_path}")
+            continue
+        sources.append(src_path)
+
+    batch_id = uuid.uuid4().hex
+    moves = list(zip(sources, plan_destination_paths(sources, dest_folder)))
+    journal_ids = journal_moves(batch_id, moves)
+    _run_journaled_moves([(journal_id, src, dest) for journal_id, (src, dest) in zip(journal_ids, moves)])
+    return batch_id
+
+
+def resume_moves(batch_id):
+    """Finishes the pending moves of an interrupted batch."""
+    remaining = []
+    already_moved = []
+    missing = []
+    for journal_id, src_path, dest_path, _ in get_journal_entries(batch_id, ["pending"]):
+        if os.path.exists(src_path):
+            remaining.append((journal_id, src_path, dest_path))
+        elif os.path.exists(dest_path):
+            # Moved before the process died, but neither the journal nor the DB record was updated yet
+            move_file_path(src_path, dest_path)
+            already_moved.append(journal_id)
+        else:
+            print(f"Source file not found: {src_path}")
+            missing.append(journal_id)
+
+    set_journal_state(already_moved, "done")
+    set_journal_state(missing, "failed")
+    _run_journaled_moves(remaining)
+
+
+def rollback_moves(batch_id):
+    """
+    Moves every file of a batch back to where it came from, newest move first.
+    Only entries that end up back at their source are marked rolled_back; the ones whose move back failed
+    or was skipped keep their state, so the journal still matches the disk and they can be retried.
+    """
+    entries = get_journal_entries(batch_id, ["pending", "done"])
+    rolled_back = []
+    for journal_id, src_path, dest_path, _ in reversed(entries):
+        if not os.path.exists(dest_path):
+            if os.path.exists(src_path):
+                # Never moved, so there is nothing to undo
+                rolled_back.append(journal_id)
+            continue
+        if os.path.exists(src_path):
+            print(f"Not moving {dest_path} back: {src_path} already exists")
+            continue
         try:
-            # Ensure the source file exists before trying to move it
-            if not os.path.exists(src_path):
-                print(f"Source file not found: {src_path}")
-                continue
-
-            filename = os.path.basename(src_path)
-            dest_path = os.path.join(dest_folder, filename)
-
-            # Check if file already exists in destination and append a number if so
-            if os.path.exists(dest_path):
-                base, ext = os.path.splitext(filename)
-                counter = 1
-                new_dest_path = os.path.join(dest_folder, f"{base}_{counter}{ext}")
-                while os.path.exists(new_dest_path):
-                    counter += 1
-                    new_dest_path = os.path.join(dest_folder, f"{base}_{counter}{ext}")
-                dest_path = new_dest_path
-
-            # Move the file
-            shutil.move(src_path, dest_path)
-            print(f"Moved file {src_path} to {dest_path}")
+            os.makedirs(os.path.dirname(src_path), exist_ok=True)
+            move_to_path(dest_path, src_path)
+            move_file_path(dest_path, src_path)
+            rolled_back.append(journal_id)
         except Exception as e:
-            print(f"Error moving file: {e}")
+            print(f"Error moving file back: {e}")
+
+    set_journal_state(rolled_back, "rolled_back")
+    return len(rolled_back)
+
+
+def resume_incomplete_moves():
+    """Resumes every batch that still has pending moves, e.g. at startup after a crash."""
+    for batch_id in get_incomplete_batches():
+        print(f"Resuming interrupted move batch {batch_id}")
+        resume_moves(batch_id)
 
 
 
@@ -1,4 +1,12 @@
+import os
 import platform
+import sys
+import tempfile
+
+# Filesystem types where many renames in flight hide the per-request round trip
+NETWORK_FILESYSTEMS = {"nfs", "nfs4", "cifs", "smbfs", "smb3", "afpfs", "fuse.sshfs", "9p", "webdav", "davfs"}
+
+_case_insensitive_devices = {}
 
 def detect_os():
     """
@@ -18,6 +26,48 @@ def detect_os():
     else:
         return "Unsupported OS"
 
+def get_filesystem_type(path):
+    """
+    Returns the filesystem type of the mount containing path (e.g. "ext4", "nfs"),
+    or None where it can't be determined. Only Linux (/proc/mounts) is supported for now.
+    """
+    try:
+        with open("/proc/mounts") as mounts:
+            entries = [line.split()[1:3] for line in mounts]
+    except OSError:
+        return None
+
+    path = os.path.realpath(path)
+    best_mount, best_type = "", None
+    for mount_point, fs_type in entries:
+        mount_point = mount_point.replace("\\040", " ")
+        if (path == mount_point or path.startswith(mount_point.rstrip("/") + "/")) and len(mount_point) > len(best_mount):
+            best_mount, best_type = mount_point, fs_type
+    return best_type
+
+def is_network_filesystem(path):
+    """Returns True if path lives on a network mount such as NFS or SMB."""
+    return get_filesystem_type(path) in NETWORK_FILESYSTEMS
+
+def is_case_insensitive(path):
+    """
+    Returns True if the filesystem holding the directory path treats "Report.pdf" and "report.pdf" as the
+    same name, as APFS and NTFS do by default. Probed once per device with a temporary file; where nothing
+    can be written there, the platform default is assumed.
+    """
+    try:
+        device = os.stat(path).st_dev
+    except OSError:
+        return sys.platform in ("darwin", "win32")
+    if device not in _case_insensitive_devices:
+        try:
+            with tempfile.NamedTemporaryFile(prefix="SmartSortCaseProbe", dir=path) as probe:
+                folded = os.path.join(path, os.path.basename(probe.name).lower())
+                _case_insensitive_devices[device] = os.path.exists(folded)
+        except OSError:
+            return sys.platform in ("darwin", "win32")
+    return _case_insensitive_devices[device]
+
 if __name__ == "__main__":
     os_name = detect_os()
     print(f"Detected Operating System: {os_name}")
@@ -0,0 +1,23 @@
+import json
+import os
+
+# Per-user configuration lives here; SMARTSORT_CONFIG_DIR overrides it (handy for tests and servers)
+DEFAULT_CONFIG_DIR = os.path.join(os.path.expanduser("~"), ".smartsort")
+
+
+def get_config_dir():
+    return os.environ.get("SMARTSORT_CONFIG_DIR", DEFAULT_CONFIG_DIR)
+
+
+def get_config_path(file_name):
+    """Returns the path file_name would have in the user's config directory (it may not exist)."""
+    return os.path.join(get_config_dir(), file_name)
+
+
+def load_json_config(file_name, default=None):
+    """Loads a JSON file from the user's config directory, returning default if it doesn't exist."""
+    path = get_config_path(file_name)
+    if not os.path.exists(path):
+        return default
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
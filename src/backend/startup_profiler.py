@@ -0,0 +1,65 @@
+import builtins
+import sys
+import time
+
+
+class StartupProfiler:
+    """
+    Times every module imported while installed and records named milestones, for main.py --profile-startup.
+    The import report has the same layout as python -X importtime: self and cumulative microseconds per
+    module, indented by nesting depth, in the order the imports finished.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.imports = []  # (depth, name, self_us, cumulative_us)
+        self.milestones = []  # (label, seconds since start)
+        self._depth = 0
+        self._child_time = [0.0]
+        self._original_import = None
+
+    def install(self):
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+        return self
+
+    def uninstall(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        # Only first imports cost anything worth reporting; modules already loaded go straight through
+        if level or name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+
+        depth = self._depth
+        self._depth += 1
+        self._child_time.append(0.0)
+        began = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            cumulative = time.perf_counter() - began
+            children = self._child_time.pop()
+            self._child_time[-1] += cumulative
+            self._depth = depth
+            self.imports.append((depth, name, (cumulative - children) * 1e6, cumulative * 1e6))
+
+    def mark(self, label):
+        self.milestones.append((label, time.perf_counter() - self.start))
+
+    def report(self, top=15, file=None):
+        file = file or sys.stderr
+        print("import time: self [us] | cumulative | imported package", file=file)
+        for depth, name, self_us, cumulative_us in self.imports:
+            print(f"import time: {self_us:9.0f} | {cumulative_us:10.0f} | {'  ' * depth}{name}", file=file)
+
+        print("\nSlowest top-level imports:", file=file)
+        top_level = sorted((entry for entry in self.imports if entry[0] == 0), key=lambda entry: -entry[3])
+        for _, name, _, cumulative_us in top_level[:top]:
+            print(f"  {cumulative_us / 1000:8.1f} ms  {name}", file=file)
+
+        print("\nStartup milestones:", file=file)
+        for label, seconds in self.milestones:
+            print(f"  {seconds * 1000:8.1f} ms  {label}", file=file)
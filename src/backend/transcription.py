@@ -1,30 +1,263 @@
-import speech_recognition as sr
-from pydub import AudioSegment
 import os
-import sys
+import shutil
+import subprocess
+import tempfile
+import time
+import wave
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
 
-from file_categorizer import categorize_file
-from src.io.extract_data import addToFileInfo
+import numpy as np
 
-def transcribeAudio(file):
-    audio = AudioSegment.from_file(file)
+from src.backend.duplicate_finder import full_hash
+from src.io.processed_data import lookup_transcripts, store_transcripts
+
+# Audio is decoded and recognized this many seconds at a time, so memory per job doesn't grow with length
+SEGMENT_SECONDS = 30
+
+# Non-WAV input is decoded by ffmpeg (the decoder pydub uses) to mono 16-bit PCM at this rate
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+
+TRANSCRIPTION_WORKERS = os.cpu_count() or 1
+
+# A segment whose recognition request fails is retried this many times, with a growing pause, then skipped
+SEGMENT_RETRIES = 3
+RETRY_DELAY = 1.0
+
+# "google" (speech_recognition's web API, the default) or "offline" for the stub recognizer
+RECOGNIZER_ENV_VAR = "SMARTSORT_RECOGNIZER"
+
+# Mono PCM audio starting start seconds into the file
+AudioChunk = namedtuple("AudioChunk", ["start", "pcm", "sample_rate", "sample_width"])
+
+
+def _to_mono16(frames, sample_width, channels):
+    """Converts PCM frames of 8, 16, 24 or 32-bit samples to mono 16-bit, the format ffmpeg output has too."""
+    if sample_width == 1:
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.int32) - 128) << 8
+    elif sample_width == 2:
+        samples = np.frombuffer(frames, dtype=np.int16).astype(np.int32)
+    elif sample_width == 3:
+        # Little-endian 24-bit: place the three bytes in the top of an int32 to keep the sign, then shift down
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        samples = ((raw[:, 0] << 8) | (raw[:, 1] << 16) | (raw[:, 2] << 24)) >> 16
+    elif sample_width == 4:
+        samples = np.frombuffer(frames, dtype=np.int32) >> 16
+    else:
+        raise ValueError(f"Unsupported sample width {sample_width}")
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples.astype(np.int16).tobytes()
+
+
+def _iter_wav_segments(file_path, segment_seconds):
+    with wave.open(file_path, "rb") as audio:
+        sample_rate = audio.getframerate()
+        sample_width = audio.getsampwidth()
+        channels = audio.getnchannels()
+        frames_per_segment = int(sample_rate * segment_seconds)
+        start = 0.0
+        while True:
+            frames = audio.readframes(frames_per_segment)
+            if not frames:
+                break
+            yield AudioChunk(start, _to_mono16(frames, sample_width, channels), sample_rate, SAMPLE_WIDTH)
+            start += segment_seconds
+
+
+def _iter_ffmpeg_segments(file_path, segment_seconds):
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise RuntimeError(f"ffmpeg is needed to decode {file_path}")
+    command = [ffmpeg, "-nostdin", "-loglevel", "error", "-i", file_path,
+               "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "-"]
+    segment_bytes = int(SAMPLE_RATE * segment_seconds) * SAMPLE_WIDTH
+    # stderr goes to a file rather than a pipe, so a chatty decoder can't block while stdout is being read
+    with tempfile.TemporaryFile() as errors, \
+            subprocess.Popen(command, stdout=subprocess.PIPE, stderr=errors) as process:
+        start = 0.0
+        try:
+            while True:
+                pcm = process.stdout.read(segment_bytes)
+                if not pcm:
+                    break
+                yield AudioChunk(start, pcm, SAMPLE_RATE, SAMPLE_WIDTH)
+                start += segment_seconds
+            # A corrupt or unsupported file ends the output early; that has to fail, not pass as silence
+            if process.wait() != 0:
+                errors.seek(0)
+                message = errors.read().decode("utf-8", "replace").strip()
+                raise RuntimeError(f"ffmpeg could not decode {file_path} (exit {process.returncode}): {message}")
+        finally:
+            if process.poll() is None:
+                process.kill()
+
+
+def _is_wav(file_path):
+    with open(file_path, "rb") as f:
+        head = f.read(12)
+    return head[:4] == b"RIFF" and head[8:12] == b"WAVE"
+
+
+def iter_segments(file_path, segment_seconds=SEGMENT_SECONDS):
+    """
+    Yields the audio of a file as mono 16-bit AudioChunks of segment_seconds each. PCM WAV files are read
+    with the wave module; anything else, including WAV encodings it can't read (float, extensible headers),
+    is streamed through an ffmpeg pipe. The whole file is never decoded at once. Undecodable files raise.
+    """
+    if _is_wav(file_path):
+        try:
+            with wave.open(file_path, "rb"):
+                pass
+        except wave.Error:
+            return _iter_ffmpeg_segments(file_path, segment_seconds)
+        return _iter_wav_segments(file_path, segment_seconds)
+    return _iter_ffmpeg_segments(file_path, segment_seconds)
+
+
+class SegmentError(Exception):
+    """Raised by a recognizer that couldn't transcribe one segment; the segment is skipped."""
+
+
+class Recognizer:
+    """
+    Turns one AudioChunk into text. name is part of the transcript cache key.
+    transcribe raises SegmentError for a segment that couldn't be done (after any retries of its own).
+    """
+
+    name = None
+
+    def transcribe(self, chunk):
+        raise NotImplementedError
 
-    wavPath = "temp.wav"
-    audio.export(wavPath, format="wav")
 
-    recognizer = sr.Recognizer()
+class SpeechRecognitionRecognizer(Recognizer):
+    """Recognition through the speech_recognition package (Google's web API by default)."""
 
-    with sr.AudioFile(wavPath) as audioFile:
-        audioData = recognizer.record(audioFile)
+    def __init__(self, engine="google"):
+        self.engine = engine
+
+    @property
+    def name(self):
+        return f"speech_recognition-{self.engine}"
+
+    def transcribe(self, chunk):
+        import speech_recognition as sr
+        audio = sr.AudioData(chunk.pcm, chunk.sample_rate, chunk.sample_width)
+        recognize = getattr(sr.Recognizer(), f"recognize_{self.engine}")
+        for attempt in range(SEGMENT_RETRIES + 1):
+            try:
+                return recognize(audio)
+            except sr.UnknownValueError:
+                return ""
+            except sr.RequestError as e:
+                if attempt == SEGMENT_RETRIES:
+                    raise SegmentError(f"Recognition of the segment at {chunk.start:.0f}s failed: {e}") from e
+                time.sleep(RETRY_DELAY * 2 ** attempt)
+
+
+class OfflineStubRecognizer(Recognizer):
+    """
+    Offline stand-in for tests: reports each segment's span and whether it is silent,
+    without any speech model or network access.
+    """
+
+    name = "offline-stub"
+
+    def __init__(self, silence_threshold=0.01):
+        self.silence_threshold = silence_threshold
+
+    def transcribe(self, chunk):
+        samples = np.frombuffer(chunk.pcm, dtype=np.int16)
+        if len(samples) == 0:
+            return ""
+        level = float(np.sqrt(np.mean(samples.astype(np.float64) ** 2))) / (2 ** (8 * chunk.sample_width - 1))
+        end = chunk.start + len(samples) / chunk.sample_rate
+        return f"[{chunk.start:.0f}s-{end:.0f}s {'speech' if level > self.silence_threshold else 'silence'}]"
+
+
+def get_recognizer():
+    if os.environ.get(RECOGNIZER_ENV_VAR) == "offline":
+        return OfflineStubRecognizer()
+    return SpeechRecognitionRecognizer()
+
+
+def _transcribe_segments(file_path, recognizer, segment_seconds):
+    """Returns (text, skipped): the joined text and how many segments the recognizer had to skip."""
+    texts = []
+    skipped = 0
+    for chunk in iter_segments(file_path, segment_seconds):
         try:
-            text = recognizer.recognize_google(audioData)
-            return text
-        except sr.unknownValueError:
-            return "Could not understand audio"
-        except sr.RequestError as e:
-            return f"There was an error {e}"
-
-#print("File Path: " + os.path.join(os.path.dirname(sys.path[0]), "backend", "temp.wav"))
-transcription = transcribeAudio(os.path.join(os.path.dirname(sys.path[0]), "backend", "temp.wav"))
-#transcription = transcribeAudio("C:\\Users\\vishw\\Documents\\harvard.wav")
-addToFileInfo("transcription", transcription)
\ No newline at end of file
+            texts.append(recognizer.transcribe(chunk))
+        except SegmentError as e:
+            print(f"Skipping part of {file_path}: {e}")
+            skipped += 1
+    return " ".join(text for text in texts if text), skipped
+
+
+def transcribe_file(file_path, recognizer=None, segment_seconds=SEGMENT_SECONDS):
+    """Transcribes one file segment by segment and returns the joined text; segments that fail are left out."""
+    return _transcribe_segments(file_path, recognizer or get_recognizer(), segment_seconds)[0]
+
+
+def _transcribe_job(file_path, recognizer, segment_seconds):
+    # Runs in a worker process; errors come back as values so one bad file doesn't stop the batch
+    try:
+        return (*_transcribe_segments(file_path, recognizer, segment_seconds), None)
+    except Exception as e:
+        return None, 0, str(e)
+
+
+def transcribe_files(file_paths, recognizer=None, max_workers=TRANSCRIPTION_WORKERS,
+                     segment_seconds=SEGMENT_SECONDS):
+    """
+    Transcribes many audio files across a process pool. Files whose content was already transcribed by
+    the same recognizer are answered from the DB; new transcripts are stored there, except those with
+    skipped segments, which are returned but transcribed again next time.
+    Returns {file_path: transcript}, leaving out files that failed to decode.
+    """
+    recognizer = recognizer or get_recognizer()
+    hashes = {}
+    for file_path in file_paths:
+        try:
+            hashes[file_path] = full_hash(file_path)
+        except OSError as e:
+            print(f"Error reading {file_path}: {e}")
+
+    cached = lookup_transcripts(recognizer.name, set(hashes.values()))
+    results = {file_path: cached[content_hash] for file_path, content_hash in hashes.items()
+               if content_hash in cached}
+
+    pending = {}
+    for file_path, content_hash in hashes.items():
+        if content_hash not in cached:
+            pending.setdefault(content_hash, file_path)
+
+    transcribed = {}
+    incomplete = set()
+    if pending:
+        paths = list(pending.values())
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(paths))) as executor:
+            outcomes = executor.map(_transcribe_job, paths, [recognizer] * len(paths),
+                                    [segment_seconds] * len(paths))
+            for file_path, (transcript, skipped, error) in zip(paths, outcomes):
+                if error is not None:
+                    print(f"Error transcribing {file_path}: {error}")
+                    continue
+                transcribed[hashes[file_path]] = transcript
+                if skipped:
+                    incomplete.add(hashes[file_path])
+        store_transcripts(recognizer.name, [(pending[content_hash], content_hash, transcript)
+                                            for content_hash, transcript in transcribed.items()
+                                            if content_hash not in incomplete])
+
+    for file_path, content_hash in hashes.items():
+        if content_hash in transcribed:
+            results[file_path] = transcribed[content_hash]
+    return results
+
+
+def transcribeAudio(file):
+    """Transcribes a single file, using and filling the transcript cache."""
+    return transcribe_files([file], max_workers=1).get(file)
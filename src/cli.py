@@ -0,0 +1,322 @@
+"""
+Headless entry point: python -m src.cli <command> ... (see README). Never imports PySide6, so it runs on
+servers, in cron jobs and in CI. Every command supports --json for machine-readable output.
+
+Exit codes: 0 success, 1 the command ran but something failed or differed (failed moves, a stale index),
+2 invalid usage or input, 130 interrupted.
+"""
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+
+EXIT_OK = 0
+EXIT_FAILURES = 1
+EXIT_USAGE = 2
+EXIT_INTERRUPTED = 130
+
+DUPLICATE_ACTIONS = ("hardlink", "skip", "quarantine")
+
+# The daemon only organizes a folder once its files have kept their size and mtime for this long
+DEFAULT_SETTLE_SECONDS = 2.0
+
+_print_lock = threading.Lock()
+
+
+class UsageError(Exception):
+    """Bad input the parser couldn't catch, such as a folder that doesn't exist."""
+
+
+def _existing_folder(path):
+    if not os.path.isdir(path):
+        raise UsageError(f"Not a folder: {path}")
+    return os.path.abspath(path)
+
+
+def _print_json(payload, stream=None):
+    stream = stream or sys.stdout
+    # The daemon prints from the watcher and the organize worker; keep their lines whole
+    with _print_lock:
+        json.dump(payload, stream, default=str)
+        stream.write("\n")
+        stream.flush()
+
+
+def command_organize(args):
+    from src.io.manual_organization_script import Organize
+
+    folder = _existing_folder(args.folder)
+    organizer = Organize(folder, dry_run=args.dry_run, max_workers=args.workers, duplicate_action=args.duplicates)
+    stats = organizer.stats or {}
+    payload = {
+        "folder": folder,
+        "dry_run": args.dry_run,
+        "planned": len(organizer.plan),
+        "moved": stats.get("moved", 0),
+        "failed": stats.get("failed", 0),
+        "seconds": stats.get("seconds", 0.0),
+        "files_per_second": stats.get("files_per_second", 0.0),
+        "duplicate_sets": len(organizer.duplicates),
+    }
+    if args.dry_run:
+        payload["moves"] = [{"source": move.source, "destination": move.destination, "category": move.category}
+                            for move in organizer.plan]
+    lines = [f"{move.source} -> {move.destination}" for move in organizer.plan] if args.dry_run else []
+    lines.append(f"{payload['planned']} planned, {payload['moved']} moved, {payload['failed']} failed")
+    return payload, lines, EXIT_FAILURES if payload["failed"] else EXIT_OK
+
+
+def command_search(args):
+    from src.backend.file_search import search_files
+
+    start = time.perf_counter()
+    results = list(itertools.islice(search_files(args.query, args.mode), args.limit))
+    payload = {"query": args.query, "mode": args.mode, "count": len(results), "results": results,
+               "seconds": time.perf_counter() - start}
+    return payload, results, EXIT_OK
+
+
+def command_index(args):
+    from src.backend.file_index import build_index, verify_index
+
+    start = time.perf_counter()
+    if args.action == "rebuild":
+        count = build_index(args.root)
+        seconds = time.perf_counter() - start
+        payload = {"action": "rebuild", "files": count, "seconds": seconds,
+                   "files_per_second": count / seconds if seconds else 0.0}
+        return payload, [f"Indexed {count} files"], EXIT_OK
+
+    report = verify_index(args.root)
+    payload = {"action": "verify", "seconds": time.perf_counter() - start,
+               **{key: len(paths) for key, paths in report.items()}, "paths": report}
+    lines = [f"{key}: {len(paths)}" for key, paths in report.items()]
+    return payload, lines, EXIT_FAILURES if any(report.values()) else EXIT_OK
+
+
+def command_dedupe(args):
+    from src.backend.duplicate_finder import find_duplicates, resolve_duplicates
+
+    source = _existing_folder(args.folder)
+    start = time.perf_counter()
+    duplicates = find_duplicates(source, min_size=args.min_size)
+    handled = resolve_duplicates(duplicates, args.action) if args.action else set()
+    payload = {
+        "folder": source,
+        "action": args.action,
+        "sets": [{"content_hash": duplicate.content_hash, "size": duplicate.size, "keep": duplicate.paths[0],
+                  "duplicates": duplicate.paths[1:]} for duplicate in duplicates],
+        "duplicate_files": sum(len(duplicate.paths) - 1 for duplicate in duplicates),
+        "reclaimable_bytes": sum(duplicate.size * (len(duplicate.paths) - 1) for duplicate in duplicates),
+        "handled": len(handled),
+        "seconds": time.perf_counter() - start,
+    }
+    lines = [f"{duplicate.paths[0]}: {', '.join(duplicate.paths[1:])}" for duplicate in duplicates]
+    lines.append(f"{payload['duplicate_files']} duplicates, {payload['reclaimable_bytes']} bytes reclaimable")
+    return payload, lines, EXIT_OK
+
+
+def command_categorize(args):
+    from src.backend.category_rules import get_rules
+    from src.backend.file_categorizer import categorize_paths
+
+    paths = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            with os.scandir(path) as entries:
+                paths.extend(entry.path for entry in entries if entry.is_file())
+        elif os.path.exists(path):
+            paths.append(path)
+        else:
+            raise UsageError(f"No such file or folder: {path}")
+
+    start = time.perf_counter()
+    rules = get_rules()
+    categories = categorize_paths(paths, rules)
+    if args.ai:
+        from src.ai.async_pipeline import categorize_files
+
+        unplaced = [path for path, category in categories.items() if category == rules.default_category]
+        if unplaced:
+            answers = categorize_files([os.path.basename(path) for path in unplaced], use_rules=False)
+            for path in unplaced:
+                categories[path] = answers.get(os.path.basename(path), categories[path])
+    seconds = time.perf_counter() - start
+    payload = {"count": len(categories), "categories": categories, "seconds": seconds,
+               "files_per_second": len(categories) / seconds if seconds else 0.0}
+    return payload, [f"{category}\t{path}" for path, category in categories.items()], EXIT_OK
+
+
+def _folder_snapshot(folder):
+    """{name: (size, mtime)} of the files in folder that aren't partial downloads."""
+    from src.backend.content_sniffer import is_partial_download
+
+    snapshot = {}
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            try:
+                if entry.is_file() and not is_partial_download(entry.name):
+                    file_stat = entry.stat()
+                    snapshot[entry.name] = (file_stat.st_size, file_stat.st_mtime)
+            except OSError:
+                pass  # Gone again already
+    return snapshot
+
+
+def _organize_worker(args, folders_queue, stop):
+    """Organizes the folders queued by the watcher, each once nothing in it has changed for args.settle seconds."""
+    from src.io.manual_organization_script import Organize
+
+    while not stop.is_set():
+        try:
+            folder = folders_queue.get(timeout=0.5)
+        except queue.Empty:
+            continue
+        if folder is None:
+            return
+
+        # Any failure is reported and the worker moves on, so one bad folder can't stop the daemon organizing
+        try:
+            # Files still being written change size or mtime between two looks; wait until they stop
+            snapshot = _folder_snapshot(folder)
+            while not stop.wait(args.settle):
+                current = _folder_snapshot(folder)
+                if current == snapshot:
+                    break
+                snapshot = current
+            if stop.is_set():
+                return
+            organizer = Organize(folder, max_workers=None, duplicate_action=args.duplicates)
+            report = {"time": time.time(), "organized": {folder: organizer.stats}}
+        except Exception as e:
+            report = {"time": time.time(), "error": f"Could not organize {folder}: {e}"}
+        if args.json:
+            _print_json(report, args.stdout)
+        else:
+            print(report.get("error") or f"Organized {folder}", file=sys.stderr)
+
+
+def command_daemon(args):
+    from src.backend.content_sniffer import is_partial_download
+    from src.backend.file_watcher import FileWatcher, get_default_watch_folders
+    from src.backend.settings import load_json_config
+
+    folders = args.folders or (load_json_config("settings.json") or {}).get("watch_folders") \
+        or get_default_watch_folders()
+    folders = [_existing_folder(folder) for folder in folders]
+
+    stop = threading.Event()
+    # Organize runs on its own thread, so the watcher thread only ever queues work and never blocks on it
+    folders_queue = queue.Queue()
+    worker = None
+    if args.organize:
+        worker = threading.Thread(target=_organize_worker, args=(args, folders_queue, stop),
+                                  name="smartsort-organize", daemon=True)
+        worker.start()
+
+    def on_events(events):
+        if args.organize:
+            touched = {os.path.dirname(event.path) for event in events
+                       if event.kind in ("created", "moved")
+                       and not is_partial_download(os.path.basename(event.path))
+                       and not os.path.isdir(event.path)}
+            for folder in sorted(touched & set(folders)):
+                folders_queue.put(folder)
+        if args.json:
+            _print_json({"time": time.time(), "events": [event._asdict() for event in events]}, args.stdout)
+        else:
+            print(f"{len(events)} changes", file=sys.stderr)
+
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signal_number, lambda *_: stop.set())
+
+    watcher = FileWatcher(roots=folders, debounce=args.debounce, on_events=on_events)
+    watcher.start()
+    print(f"Watching {', '.join(folders)}", file=sys.stderr)
+    stop.wait()
+    watcher.stop()
+    if worker is not None:
+        folders_queue.put(None)
+        worker.join()
+    return {"folders": folders, "stopped": True}, ["Stopped"], EXIT_OK
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="smartsort", description="Smart Sort without the GUI.")
+    parser.add_argument("--json", action="store_true", help="Print one JSON document instead of text")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    organize = subparsers.add_parser("organize", help="Sort a folder's files into category folders")
+    organize.add_argument("folder")
+    organize.add_argument("--dry-run", action="store_true", help="Only print the plan")
+    organize.add_argument("--workers", type=int, help="Threads for the renames")
+    organize.add_argument("--duplicates", choices=DUPLICATE_ACTIONS, help="Handle duplicate files first")
+    organize.set_defaults(handler=command_organize)
+
+    search = subparsers.add_parser("search", help="Search file names through the index")
+    search.add_argument("query")
+    search.add_argument("--mode", choices=["substring", "prefix", "trigram"], default="substring")
+    search.add_argument("--limit", type=int, default=50)
+    search.set_defaults(handler=command_search)
+
+    index = subparsers.add_parser("index", help="Rebuild or verify the filename index")
+    index.add_argument("action", choices=["rebuild", "verify"])
+    index.add_argument("root", nargs="?", help="Directory to index (defaults to the home directory)")
+    index.set_defaults(handler=command_index)
+
+    dedupe = subparsers.add_parser("dedupe", help="Find duplicate files in a folder")
+    dedupe.add_argument("folder")
+    dedupe.add_argument("--action", choices=DUPLICATE_ACTIONS, help="What to do with them (default: report)")
+    dedupe.add_argument("--min-size", type=int, default=1, help="Ignore files smaller than this many bytes")
+    dedupe.set_defaults(handler=command_dedupe)
+
+    categorize = subparsers.add_parser("categorize", help="Print the category of files or folder contents")
+    categorize.add_argument("paths", nargs="+")
+    categorize.add_argument("--ai", action="store_true", help="Ask the AI about files the rules can't place")
+    categorize.set_defaults(handler=command_categorize)
+
+    daemon = subparsers.add_parser("daemon", help="Watch folders and keep the index and DB in sync")
+    daemon.add_argument("folders", nargs="*", help="Folders to watch (default: settings.json watch_folders, "
+                                                   "else Downloads)")
+    daemon.add_argument("--organize", action="store_true", help="Organize watched folders as files arrive")
+    daemon.add_argument("--duplicates", choices=DUPLICATE_ACTIONS, help="With --organize, handle duplicates")
+    daemon.add_argument("--debounce", type=float, default=1.0, help="Seconds of quiet before a batch is handled")
+    daemon.add_argument("--settle", type=float, default=DEFAULT_SETTLE_SECONDS,
+                        help="With --organize, seconds a folder's files must stay unchanged before it is organized")
+    daemon.set_defaults(handler=command_daemon)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.stdout = sys.stdout
+    # With --json the library's progress messages go to stderr, so stdout holds only the JSON
+    output = contextlib.redirect_stdout(sys.stderr) if args.json else contextlib.nullcontext()
+    try:
+        with output:
+            payload, lines, code = args.handler(args)
+    except UsageError as e:
+        if args.json:
+            _print_json({"error": str(e)})
+        else:
+            print(f"smartsort: {e}", file=sys.stderr)
+        return EXIT_USAGE
+    except KeyboardInterrupt:
+        return EXIT_INTERRUPTED
+
+    if args.json:
+        _print_json(payload)
+    else:
+        for line in lines:
+            print(line)
+    return code
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
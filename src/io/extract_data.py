@@ -1,21 +1,122 @@
+import errno
 import os
 import stat
+import sys
 import mimetypes
 from datetime import datetime
 
+import numpy as np
+
+from src.backend.category_rules import get_rules
+from src.backend.content_sniffer import needs_sniffing, sniff_file, sniff_many
+from src.backend.file_categorizer import pick_category
+
 fileInfo = {}
 
+# One record per file in the columnar result of extract_many; times are POSIX timestamps
+METADATA_DTYPE = np.dtype([
+    ("path", object),
+    ("size", np.int64),
+    ("mtime", np.float64),
+    ("atime", np.float64),
+    ("ctime", np.float64),
+    ("birthtime", np.float64),
+    ("mode", np.uint32),
+    ("inode", np.uint64),  # 0 on Windows, whose directory listings carry no file ids
+    ("mime", object),
+    ("category", object),
+])
+
 def getMimeType(filePath):
     mimeType, _ = mimetypes.guess_type(filePath)
+    if mimeType is None:
+        # No or unknown extension: fall back to the file's magic number
+        mimeType, _ = sniff_file(filePath)
     return mimeType
 
+def get_creation_time(file_stat):
+    """
+    When the file was created. st_birthtime exists on macOS and the BSDs (and Windows from Python 3.12);
+    older Windows builds report creation time as st_ctime. Linux has neither through os.stat, so the
+    earliest of the change and modification times is the closest we get.
+    """
+    birthtime = getattr(file_stat, "st_birthtime", None)
+    if birthtime is not None:
+        return birthtime
+    if sys.platform == "win32":
+        return file_stat.st_ctime
+    return min(file_stat.st_ctime, file_stat.st_mtime)
+
+def _stat_entries(source):
+    """
+    Yields (path, stat) for the files in a directory, a single file, or an iterable of paths or DirEntry objects.
+    A path that doesn't exist raises FileNotFoundError.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        if not os.path.isdir(source):
+            if not os.path.exists(source):
+                raise FileNotFoundError(errno.ENOENT, "No such file or directory", os.fspath(source))
+            source = [source]
+        else:
+            with os.scandir(source) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_file():
+                            # DirEntry caches its stat result (on Windows it comes free with the listing)
+                            yield entry.path, entry.stat()
+                    except OSError as e:
+                        print(f"Error reading metadata of {entry.path}: {e}")
+            return
+    for item in source:
+        try:
+            if isinstance(item, os.DirEntry):
+                yield item.path, item.stat()
+            else:
+                yield os.fspath(item), os.stat(item)
+        except OSError as e:
+            print(f"Error reading metadata of {item}: {e}")
+
+def extract_many(source, rules=None, sniff=True):
+    """
+    Metadata for many files in one pass: source is a directory (its files, not subfolders), a single file or
+    an iterable of paths; a source path that doesn't exist raises FileNotFoundError. Each file is stat'ed once; MIME type and category come from the extension rules, and files those
+    can't place are sniffed over a thread pool (unless sniff is False).
+    Returns a NumPy structured array of METADATA_DTYPE, so columns like result["size"] are plain arrays.
+    """
+    rules = rules or get_rules()
+    stats = list(_stat_entries(source))
+    metadata = np.empty(len(stats), dtype=METADATA_DTYPE)
+    unresolved = []
+    for i, (path, file_stat) in enumerate(stats):
+        name = os.path.basename(path)
+        mime, _ = mimetypes.guess_type(name)
+        category = rules.categorize(name)
+        metadata[i] = (path, file_stat.st_size, file_stat.st_mtime, file_stat.st_atime, file_stat.st_ctime,
+                       get_creation_time(file_stat), file_stat.st_mode, file_stat.st_ino, mime, category)
+        if sniff and (mime is None or needs_sniffing(name, category, rules.default_category)):
+            unresolved.append(i)
+
+    sniffed = sniff_many(metadata["path"][unresolved])
+    for i in unresolved:
+        path = metadata["path"][i]
+        sniffed_mime, sniffed_category = sniffed[path]
+        metadata["mime"][i] = sniffed_mime or metadata["mime"][i]
+        metadata["category"][i] = pick_category(os.path.basename(path), metadata["category"][i], sniffed_category)
+    return metadata
+
+def to_file_records(metadata, rules=None):
+    """(file_path, file_extension, category, file_color) rows for processed_data.add_files."""
+    rules = rules or get_rules()
+    return [(path, os.path.splitext(path)[1][1:].lower(), category, rules.get_color(category))
+            for path, category in zip(metadata["path"], metadata["category"])]
+
 def extractData(filePath):
     fileProperties = os.stat(filePath)
 
     fileSize = fileProperties.st_size
     modificationTime = fileProperties.st_mtime
     accessTime = fileProperties.st_atime
-    creationTime = fileProperties.st_birthtime
+    creationTime = get_creation_time(fileProperties)
     filePermissions = fileProperties.st_mode
     fileType = getMimeType(filePath)
 
@@ -56,5 +157,3 @@ def extractData(filePath):
 def addToFileInfo(key, value):
     #print("Key: " + key + " Value: " + value)
     fileInfo[key] = value
-
-print(extractData("test.txt"))
\ No newline at end of file
@@ -1,91 +1,153 @@
 import os
-
-from src.io.processed_data import lookup_files_by_file_path, add_file
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from src.backend.category_rules import get_rules
+from src.backend.content_sniffer import is_partial_download
+from src.backend.duplicate_finder import find_duplicates, resolve_duplicates
+from src.backend.file_categorizer import categorize_paths
+from src.backend.file_manager import move_to_path
+from src.backend.folder_categorizer import plan_destination_paths
+from src.backend.os_detection import is_network_filesystem
+from src.io.extract_data import extract_many
+from src.io.processed_data import upsert_many
 
 # This is only if the AI version isn't done
 
 aiVersionDone = False
 
+# Renames on network mounts are latency bound, so they are spread over this many threads
+NETWORK_RENAME_WORKERS = 16
+
+# One entry of an organize plan: move source to destination and record it with category and color
+PlannedMove = namedtuple("PlannedMove", ["source", "destination", "category", "color"])
+
 
 def get_file_types():
-    return {
-        "mp4": "video",
-        "avi": "video",
-        "mkv": "video",
-        "mov": "video",
-        "wmv": "video",
-        "flv": "video",
-        "wav": "audio",
-        "mp3": "audio",
-        "aac": "audio",
-        "ogg": "audio",
-        "flac": "audio",
-        "pdf": "document",
-        "doc": "document",
-        "docx": "document",
-        "xls": "document",
-        "xlsx": "document",
-        "ppt": "document",
-        "pptx": "document",
-        "txt": "text",
-        "csv": "text",
-        "html": "web",
-        "css": "web",
-        "js": "web",
-        "zip": "archive",
-        "rar": "archive",
-        "tar": "archive",
-        "gz": "archive",
-    }
+    """Returns {extension: category}; the rules themselves live in backend/category_rules.json."""
+    return get_rules().extension_map()
 
 
 def get_category_colors():
+    return dict(get_rules().colors)
+
+
+def plan_moves(folder_file_path, rules=None, metadata=None):
+    """
+    Computes the complete move plan for a folder from a single os.scandir pass, without touching disk.
+    Files the rules can't place are sniffed for their content; whatever still falls into the default
+    category, partial downloads (which the browser renames when they finish) and subfolders are left where
+    they are.
+    Names already taken in a destination folder get an _N suffix (as in folder_categorizer), so the plan,
+    and a dry run, show the final names and nothing is overwritten.
+    metadata from extract_data.extract_many for the folder can be passed in to reuse its categories.
+    """
+    rules = rules or get_rules()
+    if metadata is not None:
+        files = {path: os.path.basename(path) for path in metadata["path"]
+                 if not is_partial_download(os.path.basename(path))}
+        categories = {path: category for path, category in zip(metadata["path"], metadata["category"])
+                      if path in files}
+    else:
+        with os.scandir(folder_file_path) as entries:
+            files = {entry.path: entry.name for entry in entries
+                     if entry.is_file() and not is_partial_download(entry.name)}
+        categories = categorize_paths(files, rules)
+
+    # Files go to <folder>/<type>/<color>/<name>
+    by_folder = {}
+    for path, file_type in categories.items():
+        if file_type == rules.default_category:
+            continue
+        file_color = rules.get_color(file_type)
+        destination_folder = os.path.join(folder_file_path, file_type, file_color)
+        by_folder.setdefault((destination_folder, file_type, file_color), []).append(path)
+
+    plan = []
+    for (destination_folder, file_type, file_color), paths in by_folder.items():
+        for path, destination in zip(paths, plan_destination_paths(paths, destination_folder)):
+            plan.append(PlannedMove(path, destination, file_type, file_color))
+    return plan
+
+
+def _rename(move):
+    # Never replaces a file that appeared at the destination after planning; that move fails instead
+    try:
+        move_to_path(move.source, move.destination)
+        return True
+    except OSError as e:
+        print(f"Error moving file {move.source}: {e}")
+        return False
+
+
+def execute_plan(plan, max_workers=None):
+    """
+    Carries out a plan from plan_moves: every destination directory is created once, the renames run
+    (over a thread pool on network mounts, or when max_workers is given) and the DB records for the
+    moved files are written in a single transaction.
+    Returns a dict with the number of files moved and failed, the elapsed seconds and files per second.
+    """
+    start = time.perf_counter()
+
+    for directory in sorted({os.path.dirname(move.destination) for move in plan}):
+        os.makedirs(directory, exist_ok=True)
+
+    if max_workers is None:
+        network = plan and is_network_filesystem(os.path.dirname(plan[0].source))
+        max_workers = NETWORK_RENAME_WORKERS if network else 1
+
+    if max_workers > 1 and len(plan) > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(_rename, plan))
+    else:
+        results = [_rename(move) for move in plan]
+
+    moved = [move for move, ok in zip(plan, results) if ok]
+    # Record where the files ended up, which is what the file explorer looks them up by
+    upsert_many((move.destination, os.path.splitext(move.destination)[1][1:], move.category, move.color)
+                for move in moved)
+
+    seconds = time.perf_counter() - start
     return {
-        "video": "red",
-        "audio": "blue",
-        "document": "green",
-        "text": "orange",
-        "web": "purple",
-        "archive": "brown",
-        "other": "gray"
+        "moved": len(moved),
+        "failed": len(plan) - len(moved),
+        "seconds": seconds,
+        "files_per_second": len(moved) / seconds if seconds > 0 else 0.0,
     }
 
 
 class Organize:
-    def __init__(self, folder_file_path):
+    def __init__(self, folder_file_path, dry_run=False, max_workers=None, duplicate_action=None):
         if not aiVersionDone:
             self.folder_file_path = folder_file_path
-            self.file_types = get_file_types()
+            self.rules = get_rules()
+            self.dry_run = dry_run
+            self.max_workers = max_workers
+            # None, or a duplicate_finder action ("hardlink", "skip" or "quarantine") applied before planning
+            self.duplicate_action = duplicate_action
+            self.duplicates = []
+            self.plan = []
+            self.stats = None
             self.organize_files()
 
     def organize_files(self):
-        folder_files = os.listdir(self.folder_file_path)
-
-        for file in folder_files:
-            file_extension = os.path.splitext(file)[1][1:]  # Get the extension without the dot
-            file_type = self.file_types.get(file_extension)
-            file_color = get_category_colors().get(file_type)
-
-            if file_type:
-                # Create the directory for the file type if it doesn't exist
-                type_folder_path = os.path.join(self.folder_file_path, file_type)  # Only use file_type
-
-                if not os.path.exists(type_folder_path):
-                    os.mkdir(type_folder_path)
-
-                # Create a subdirectory for the color if required
-                color_folder_path = os.path.join(type_folder_path, file_color)
-                if not os.path.exists(color_folder_path):
-                    os.mkdir(color_folder_path)
-
-                # Check if file is stored in the DB
-                db_file_data = lookup_files_by_file_path(os.path.join(self.folder_file_path, file))
-
-                if db_file_data is None or db_file_data == []:
-                    add_file(os.path.join(self.folder_file_path, file), file_extension, file_type,
-                             file_color)  # Add color
-
-                # Move the file to the respective directory
-                old_file_path = os.path.join(self.folder_file_path, file)
-                new_file_path = os.path.join(color_folder_path, file)  # Move to the color directory
-                os.rename(old_file_path, new_file_path)
+        """Plans the moves for the folder and, unless this is a dry run, executes them. Returns the plan."""
+        skipped = set()
+        metadata = None
+        if self.duplicate_action:
+            # One stat pass serves both the duplicate search and the plan
+            metadata = extract_many(self.folder_file_path, self.rules)
+            self.duplicates = find_duplicates(self.folder_file_path, rules=self.rules, metadata=metadata)
+            # A dry run leaves out the same files the real run would, it just doesn't link or move them
+            skipped = resolve_duplicates(self.duplicates, self.duplicate_action, dry_run=self.dry_run)
+
+        self.plan = [move for move in plan_moves(self.folder_file_path, self.rules, metadata)
+                     if move.source not in skipped]
+        if self.dry_run:
+            return self.plan
+
+        self.stats = execute_plan(self.plan, self.max_workers)
+        print(f"Organized {self.stats['moved']} files in {self.stats['seconds']:.2f}s "
+              f"({self.stats['files_per_second']:.0f} files/s)")
+        return self.plan
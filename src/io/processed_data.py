@@ -1,29 +1,266 @@
+import os
 import sqlite3
+import threading
+import time
+
+DATABASE_PATH = 'ai_file_results_test.db'
+
+# SQLite caps the number of bound parameters per statement, so IN (...) lookups are chunked
+LOOKUP_CHUNK_SIZE = 500
+
+_local = threading.local()
+
+
+def normalize_path(file_path):
+    """The form file paths are stored and looked up in, so /a/b, /a//b and /a/b/ are the same record."""
+    return os.path.normpath(file_path)
+
+
+def _path_prefix(file_path):
+    return normalize_path(file_path).rstrip(os.sep) + os.sep
+
+
+# Schema migrations, applied in order. PRAGMA user_version records how many have run on a database,
+# so existing ai_file_results_test.db files are upgraded in place the first time they are opened.
+
+def _migration_create_files_table(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS files (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        file_path TEXT NOT NULL,
+                        file_extension TEXT NOT NULL,
+                        category TEXT NOT NULL,
+                        file_color TEXT NOT NULL
+                    )''')
+
+
+def _migration_unique_file_path(conn):
+    # Normalize stored paths, keep the newest record for each path, then enforce uniqueness
+    rows = conn.execute('SELECT id, file_path FROM files').fetchall()
+    conn.executemany('UPDATE files SET file_path = ? WHERE id = ?',
+                     [(normalize_path(path), file_id) for file_id, path in rows if normalize_path(path) != path])
+    conn.execute('DELETE FROM files WHERE id NOT IN (SELECT MAX(id) FROM files GROUP BY file_path)')
+    conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS files_file_path ON files (file_path)')
+
+
+def _migration_full_text_search(conn):
+    # SQLite builds without FTS5 trigram support keep using LIKE scans in search_files
+    try:
+        conn.execute('''CREATE VIRTUAL TABLE files_fts
+                        USING fts5(file_path, category, content='files', content_rowid='id', tokenize='trigram')''')
+    except sqlite3.OperationalError:
+        return
+    conn.execute('''CREATE TRIGGER files_fts_insert AFTER INSERT ON files BEGIN
+                        INSERT INTO files_fts (rowid, file_path, category) VALUES (new.id, new.file_path, new.category);
+                    END''')
+    conn.execute('''CREATE TRIGGER files_fts_delete AFTER DELETE ON files BEGIN
+                        INSERT INTO files_fts (files_fts, rowid, file_path, category)
+                        VALUES ('delete', old.id, old.file_path, old.category);
+                    END''')
+    conn.execute('''CREATE TRIGGER files_fts_update AFTER UPDATE OF file_path, category ON files BEGIN
+                        INSERT INTO files_fts (files_fts, rowid, file_path, category)
+                        VALUES ('delete', old.id, old.file_path, old.category);
+                        INSERT INTO files_fts (rowid, file_path, category) VALUES (new.id, new.file_path, new.category);
+                    END''')
+    conn.execute("INSERT INTO files_fts (files_fts) VALUES ('rebuild')")
+
+
+def _migration_move_journal(conn):
+    # Write-ahead journal for bulk moves: every move of a batch is recorded as pending before anything moves
+    conn.execute('''CREATE TABLE move_journal (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        batch_id TEXT NOT NULL,
+                        src_path TEXT NOT NULL,
+                        dest_path TEXT NOT NULL,
+                        state TEXT NOT NULL DEFAULT 'pending',
+                        created_at REAL NOT NULL
+                    )''')
+    conn.execute('CREATE INDEX move_journal_batch ON move_journal (batch_id, state)')
+
+
+def _migration_ai_category_cache(conn):
+    # Answers from the AI categorizer, keyed by prompt version and normalized file name
+    conn.execute('''CREATE TABLE ai_category_cache (
+                        cache_key TEXT PRIMARY KEY,
+                        category TEXT NOT NULL,
+                        created_at REAL NOT NULL,
+                        last_used_at REAL NOT NULL
+                    )''')
+    conn.execute('CREATE INDEX ai_category_cache_last_used ON ai_category_cache (last_used_at)')
+
+
+def _migration_embeddings(conn):
+    # Rows of the memory-mapped embedding matrix (ai/vector_store.py), keyed by the content they embed
+    conn.execute('''CREATE TABLE embeddings (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        file_path TEXT NOT NULL,
+                        content_hash TEXT NOT NULL UNIQUE,
+                        row INTEGER NOT NULL UNIQUE
+                    )''')
+    conn.execute('CREATE INDEX embeddings_file_path ON embeddings (file_path)')
+
+
+def _migration_embedding_stores(conn):
+    # One vector store per embedding backend: rows and content hashes are unique within a store
+    conn.execute('''CREATE TABLE embeddings_new (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        store TEXT NOT NULL,
+                        file_path TEXT NOT NULL,
+                        content_hash TEXT NOT NULL,
+                        row INTEGER NOT NULL,
+                        UNIQUE (store, content_hash),
+                        UNIQUE (store, row)
+                    )''')
+    # Everything stored so far came from the OpenAI embeddings
+    conn.execute('''INSERT INTO embeddings_new (id, store, file_path, content_hash, row)
+                    SELECT id, 'openai', file_path, content_hash, row FROM embeddings''')
+    conn.execute('DROP TABLE embeddings')
+    conn.execute('ALTER TABLE embeddings_new RENAME TO embeddings')
+    conn.execute('CREATE INDEX embeddings_file_path ON embeddings (file_path)')
+
+
+def _migration_file_hashes(conn):
+    # Content hashes from the duplicate finder, valid while the file's (inode, size, mtime) is unchanged
+    conn.execute('ALTER TABLE files ADD COLUMN inode INTEGER')
+    conn.execute('ALTER TABLE files ADD COLUMN size INTEGER')
+    conn.execute('ALTER TABLE files ADD COLUMN mtime REAL')
+    conn.execute('ALTER TABLE files ADD COLUMN partial_hash TEXT')
+    conn.execute('ALTER TABLE files ADD COLUMN content_hash TEXT')
+    conn.execute('CREATE INDEX files_inode ON files (inode, size, mtime)')
+
+
+def _migration_transcripts(conn):
+    # Transcripts of audio files, keyed by the content they were made from and the recognizer that made them
+    conn.execute('''CREATE TABLE transcripts (
+                        content_hash TEXT NOT NULL,
+                        recognizer TEXT NOT NULL,
+                        file_path TEXT NOT NULL,
+                        transcript TEXT NOT NULL,
+                        created_at REAL NOT NULL,
+                        PRIMARY KEY (content_hash, recognizer)
+                    )''')
+    conn.execute('CREATE INDEX transcripts_file_path ON transcripts (file_path)')
+
+
+def _migration_file_device(conn):
+    # An inode number only identifies a file together with its device. Hashes stored before this have no
+    # device, so they never match a lookup and the files are simply hashed again
+    conn.execute('ALTER TABLE files ADD COLUMN device INTEGER')
+
+
+MIGRATIONS = [
+    _migration_create_files_table,
+    _migration_unique_file_path,
+    _migration_full_text_search,
+    _migration_move_journal,
+    _migration_ai_category_cache,
+    _migration_embeddings,
+    _migration_embedding_stores,
+    _migration_file_hashes,
+    _migration_transcripts,
+    _migration_file_device,
+]
+
+
+def get_schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn):
+    """
+    Run every migration the database hasn't seen yet, each in its own BEGIN IMMEDIATE transaction together
+    with the user_version bump, so a crash never leaves a half-applied migration behind. The version is
+    re-read once the write lock is held, so threads and processes opening a new database at the same time
+    apply each migration exactly once. conn must be in autocommit mode (isolation_level=None).
+    """
+    while get_schema_version(conn) < len(MIGRATIONS):
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            version = get_schema_version(conn)
+            if version < len(MIGRATIONS):
+                MIGRATIONS[version](conn)
+                conn.execute(f'PRAGMA user_version = {version + 1}')
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+
+def has_full_text_search(conn):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'files_fts'").fetchone() is not None
+
+
+def _open_connection(db_path):
+    # Autocommit while migrating, so the explicit transactions in migrate also cover the DDL
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    conn.execute('PRAGMA cache_size=-16000')
+    migrate(conn)
+    # Back to implicit transactions for the with-conn blocks everything else uses
+    conn.isolation_level = ''
+    return conn
+
 
 def get_database_connection():
-    """Create and return a new database connection."""
-    return sqlite3.connect('ai_file_results_test.db')
+    """
+    Return this thread's database connection, opening it on first use.
+    Use it as a context manager (with get_database_connection() as conn) to get one transaction.
+    """
+    db_path = os.path.abspath(DATABASE_PATH)
+    conn = getattr(_local, 'connection', None)
+    if conn is None or _local.db_path != db_path:
+        if conn is not None:
+            conn.close()
+        conn = _open_connection(db_path)
+        _local.connection = conn
+        _local.db_path = db_path
+    return conn
+
+
+def close_database_connection():
+    """Close this thread's connection, if it has one."""
+    conn = getattr(_local, 'connection', None)
+    if conn is not None:
+        conn.close()
+        _local.connection = None
 
 def add_file(file_path, file_extension, category, file_color):
-    with get_database_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute('''INSERT INTO files (file_path, file_extension, category, file_color)
-                          VALUES (?, ?, ?, ?)''', (file_path, file_extension, category, file_color))
-        conn.commit()
+    add_files([(file_path, file_extension, category, file_color)])
 
 def remove_file(file_id):
     with get_database_connection() as conn:
         cursor = conn.cursor()
         cursor.execute('DELETE FROM files WHERE id = ?', (file_id,))
-        conn.commit()
+
+def remove_files_by_file_path(file_path):
+    """Delete the record for file_path and for anything stored below it."""
+    prefix = _path_prefix(file_path)
+    with get_database_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM files WHERE file_path = ? OR (file_path >= ? AND file_path < ?)',
+                       (normalize_path(file_path), prefix, prefix + '\U0010ffff'))
+
+def move_file_path(old_path, new_path):
+    """Point records for old_path (and anything stored below it) at new_path."""
+    old_path, new_path = normalize_path(old_path), normalize_path(new_path)
+    old_prefix, new_prefix = _path_prefix(old_path), _path_prefix(new_path)
+    with get_database_connection() as conn:
+        cursor = conn.cursor()
+        # Whatever was stored at the destination has been overwritten on disk
+        cursor.execute('DELETE FROM files WHERE file_path = ?', (new_path,))
+        cursor.execute('UPDATE files SET file_path = ? WHERE file_path = ?', (new_path, old_path))
+        cursor.execute('''UPDATE OR REPLACE files SET file_path = ? || substr(file_path, ?)
+                          WHERE file_path >= ? AND file_path < ?''',
+                       (new_prefix, len(old_prefix) + 1, old_prefix, old_prefix + '\U0010ffff'))
 
 def update_file(file_id, new_file_path, new_file_extension, new_category, new_file_color):
     with get_database_connection() as conn:
         cursor = conn.cursor()
         cursor.execute('''UPDATE files
                           SET file_path = ?, file_extension = ?, category = ?, file_color = ?
-                          WHERE id = ?''', (new_file_path, new_file_extension, new_category, new_file_color, file_id))
-        conn.commit()
+                          WHERE id = ?''', (normalize_path(new_file_path), new_file_extension, new_category,
+                                            new_file_color, file_id))
 
 def get_all_files():
     with get_database_connection() as conn:
@@ -38,20 +275,298 @@ def lookup_file_by_id(file_id):
         return cursor.fetchone()
 
 
+def lookup_file_by_path(file_path):
+    """Return the record stored for exactly file_path as a dict, or None. Uses the unique file_path index."""
+    conn = get_database_connection()
+    row = conn.execute('SELECT * FROM files WHERE file_path = ?', (normalize_path(file_path),)).fetchone()
+    return _row_to_dict(row) if row else None
+
+
+def lookup_files_by_prefix(directory):
+    """Return every record stored anywhere below directory, as dicts, using an index range scan."""
+    prefix = _path_prefix(directory)
+    conn = get_database_connection()
+    rows = conn.execute('SELECT * FROM files WHERE file_path >= ? AND file_path < ? ORDER BY file_path',
+                        (prefix, prefix + '\U0010ffff'))
+    return [_row_to_dict(row) for row in rows]
+
+
 def lookup_files_by_file_path(file_path):
-    with get_database_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM files WHERE file_path LIKE ?', ('%' + file_path + '%',))
-        rows = cursor.fetchall()
+    # Exact match; this used to be LIKE '%path%', which also matched /a/b2/c when asked for /a/b
+    record = lookup_file_by_path(file_path)
+    return [record] if record else []
 
-        # Convert to a list of dictionaries
-        keys = ['id', 'file_path', 'file_extension', 'category', 'file_color']
-        return [dict(zip(keys, row)) for row in rows]
+
+def _fts_phrase(text):
+    return '"' + text.replace('"', '""') + '"'
 
 
 def search_files(query):
+    """Return records whose path or category contains query, through the FTS5 trigram index when possible."""
     with get_database_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute('SELECT * FROM files WHERE file_path LIKE ? OR category LIKE ?',
-                       ('%' + query + '%', '%' + query + '%'))
+        if len(query) >= 3 and has_full_text_search(conn):
+            cursor.execute('''SELECT files.* FROM files_fts JOIN files ON files.id = files_fts.rowid
+                              WHERE files_fts MATCH ?''', (_fts_phrase(query),))
+        else:
+            cursor.execute('SELECT * FROM files WHERE file_path LIKE ? OR category LIKE ?',
+                           ('%' + query + '%', '%' + query + '%'))
         return cursor.fetchall()
+
+
+def lookup_files_in_directory(directory):
+    """
+    Return {file_path: (category, file_color)} for every file stored directly inside directory,
+    fetched with a single index range scan.
+    """
+    prefix = _path_prefix(directory)
+    with get_database_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''SELECT file_path, category, file_color FROM files
+                          WHERE file_path >= ? AND file_path < ? AND instr(substr(file_path, ?), ?) = 0''',
+                       (prefix, prefix + '\U0010ffff', len(prefix) + 1, os.sep))
+        return {file_path: (category, file_color) for file_path, category, file_color in cursor.fetchall()}
+
+
+def _row_to_dict(row):
+    keys = ['id', 'file_path', 'file_extension', 'category', 'file_color']
+    return dict(zip(keys, row))
+
+
+def add_files(rows):
+    """
+    Insert many (file_path, file_extension, category, file_color) rows in a single transaction.
+    A path that is already stored has its record replaced.
+    """
+    upsert_many(rows)
+
+
+def lookup_many(file_paths):
+    """Return {file_path: row dict} for the given exact paths. Paths that aren't stored are left out."""
+    file_paths = [normalize_path(path) for path in file_paths]
+    found = {}
+    conn = get_database_connection()
+    for start in range(0, len(file_paths), LOOKUP_CHUNK_SIZE):
+        chunk = file_paths[start:start + LOOKUP_CHUNK_SIZE]
+        placeholders = ', '.join('?' * len(chunk))
+        for row in conn.execute(f'SELECT * FROM files WHERE file_path IN ({placeholders})', chunk):
+            found[row[1]] = _row_to_dict(row)
+    return found
+
+
+def upsert_many(rows):
+    """
+    Insert or update many (file_path, file_extension, category, file_color) rows in a single transaction.
+    Existing records are matched on the exact file path.
+    """
+    with get_database_connection() as conn:
+        conn.executemany('''INSERT INTO files (file_path, file_extension, category, file_color)
+                            VALUES (?, ?, ?, ?)
+                            ON CONFLICT(file_path) DO UPDATE SET file_extension = excluded.file_extension,
+                                category = excluded.category, file_color = excluded.file_color''',
+                         [(normalize_path(path), extension, category, color)
+                          for path, extension, category, color in rows])
+
+
+def journal_moves(batch_id, moves):
+    """Record (src_path, dest_path) moves of a batch as pending, in one transaction. Returns their journal ids."""
+    created_at = time.time()
+    with get_database_connection() as conn:
+        conn.executemany('INSERT INTO move_journal (batch_id, src_path, dest_path, created_at) VALUES (?, ?, ?, ?)',
+                         [(batch_id, src, dest, created_at) for src, dest in moves])
+        rows = conn.execute('SELECT id FROM move_journal WHERE batch_id = ? ORDER BY id', (batch_id,))
+        return [journal_id for (journal_id,) in rows]
+
+
+def set_journal_state(journal_ids, state):
+    """Mark journal entries as 'done', 'failed', 'pending' or 'rolled_back' in one transaction."""
+    with get_database_connection() as conn:
+        conn.executemany('UPDATE move_journal SET state = ? WHERE id = ?', [(state, i) for i in journal_ids])
+
+
+def get_journal_entries(batch_id, states=None):
+    """Return (id, src_path, dest_path, state) for a batch in the order the moves were planned."""
+    conn = get_database_connection()
+    sql = 'SELECT id, src_path, dest_path, state FROM move_journal WHERE batch_id = ?'
+    params = [batch_id]
+    if states:
+        sql += f' AND state IN ({", ".join("?" * len(states))})'
+        params.extend(states)
+    return conn.execute(sql + ' ORDER BY id', params).fetchall()
+
+
+def get_incomplete_batches():
+    """Return the ids of batches that still have pending moves, oldest first."""
+    conn = get_database_connection()
+    rows = conn.execute('''SELECT batch_id FROM move_journal WHERE state = 'pending'
+                            GROUP BY batch_id ORDER BY MIN(id)''')
+    return [batch_id for (batch_id,) in rows]
+
+
+def lookup_ai_categories(cache_keys, max_age=None):
+    """
+    Return {cache_key: category} for cached AI answers, skipping entries older than max_age seconds.
+    Hits have their last_used_at refreshed so eviction drops the least recently used entries first.
+    """
+    cache_keys = list(cache_keys)
+    now = time.time()
+    oldest = now - max_age if max_age is not None else 0
+    found = {}
+    with get_database_connection() as conn:
+        for start in range(0, len(cache_keys), LOOKUP_CHUNK_SIZE):
+            chunk = cache_keys[start:start + LOOKUP_CHUNK_SIZE]
+            placeholders = ', '.join('?' * len(chunk))
+            rows = conn.execute(f'''SELECT cache_key, category FROM ai_category_cache
+                                     WHERE cache_key IN ({placeholders}) AND created_at >= ?''', chunk + [oldest])
+            found.update(rows)
+        conn.executemany('UPDATE ai_category_cache SET last_used_at = ? WHERE cache_key = ?',
+                         [(now, key) for key in found])
+    return found
+
+
+def store_ai_categories(categories):
+    """Store {cache_key: category} AI answers in one transaction."""
+    now = time.time()
+    with get_database_connection() as conn:
+        conn.executemany('''INSERT OR REPLACE INTO ai_category_cache (cache_key, category, created_at, last_used_at)
+                            VALUES (?, ?, ?, ?)''', [(key, category, now, now) for key, category in categories.items()])
+
+
+def evict_ai_categories(max_age=None, max_entries=None):
+    """Drop cached AI answers older than max_age seconds, then the least recently used beyond max_entries."""
+    with get_database_connection() as conn:
+        if max_age is not None:
+            conn.execute('DELETE FROM ai_category_cache WHERE created_at < ?', (time.time() - max_age,))
+        if max_entries is not None:
+            conn.execute('''DELETE FROM ai_category_cache WHERE cache_key IN (
+                                SELECT cache_key FROM ai_category_cache ORDER BY last_used_at DESC LIMIT -1 OFFSET ?
+                            )''', (max_entries,))
+
+
+def lookup_embedding_rows(store, content_hashes):
+    """Return {content_hash: row} for hashes that already have an embedding in store."""
+    content_hashes = list(content_hashes)
+    found = {}
+    conn = get_database_connection()
+    for start in range(0, len(content_hashes), LOOKUP_CHUNK_SIZE):
+        chunk = content_hashes[start:start + LOOKUP_CHUNK_SIZE]
+        placeholders = ', '.join('?' * len(chunk))
+        found.update(conn.execute(f'''SELECT content_hash, row FROM embeddings
+                                      WHERE store = ? AND content_hash IN ({placeholders})''', [store, *chunk]))
+    return found
+
+
+def add_embedding_rows(store, entries, before_commit=None):
+    """
+    Record new (file_path, content_hash) embeddings of store in one transaction and return {content_hash: row},
+    with rows allocated after the last one in use. Hashes that are already stored keep their row.
+    before_commit({content_hash: row}) is called with the new rows while the transaction is still open, so the
+    vectors can be written before any row pointing at them becomes visible.
+    """
+    entries = list(entries)
+    with get_database_connection() as conn:
+        existing = lookup_embedding_rows(store, (content_hash for _, content_hash in entries))
+        next_row = count_embeddings(store)
+        new_rows = {}
+        for file_path, content_hash in entries:
+            if content_hash in existing or content_hash in new_rows:
+                continue
+            new_rows[content_hash] = (normalize_path(file_path), next_row)
+            next_row += 1
+        conn.executemany('INSERT INTO embeddings (store, file_path, content_hash, row) VALUES (?, ?, ?, ?)',
+                         [(store, path, content_hash, row) for content_hash, (path, row) in new_rows.items()])
+        conn.executemany('UPDATE embeddings SET file_path = ? WHERE store = ? AND content_hash = ?',
+                         [(normalize_path(path), store, content_hash) for path, content_hash in entries
+                          if content_hash in existing])
+        if before_commit is not None and new_rows:
+            before_commit({content_hash: row for content_hash, (_, row) in new_rows.items()})
+    existing.update((content_hash, row) for content_hash, (_, row) in new_rows.items())
+    return existing
+
+
+def get_embedding_paths(store, rows):
+    """Return {row: file_path} for embedding rows of store."""
+    rows = [int(row) for row in rows]
+    found = {}
+    conn = get_database_connection()
+    for start in range(0, len(rows), LOOKUP_CHUNK_SIZE):
+        chunk = rows[start:start + LOOKUP_CHUNK_SIZE]
+        placeholders = ', '.join('?' * len(chunk))
+        found.update(conn.execute(f'SELECT row, file_path FROM embeddings WHERE store = ? AND row IN ({placeholders})',
+                                  [store, *chunk]))
+    return found
+
+
+def count_embeddings(store):
+    conn = get_database_connection()
+    return conn.execute('SELECT COALESCE(MAX(row), -1) + 1 FROM embeddings WHERE store = ?', (store,)).fetchone()[0]
+
+
+def lookup_file_hashes(keys):
+    """
+    Return {(device, inode, size, mtime): (partial_hash, content_hash)} for the given keys that have stored hashes.
+    content_hash is None when only the partial (head and tail) hash was needed.
+    """
+    keys = set(keys)
+    inodes = list({inode for _, inode, _, _ in keys})
+    found = {}
+    conn = get_database_connection()
+    for start in range(0, len(inodes), LOOKUP_CHUNK_SIZE):
+        chunk = inodes[start:start + LOOKUP_CHUNK_SIZE]
+        placeholders = ', '.join('?' * len(chunk))
+        for device, inode, size, mtime, partial_hash, content_hash in conn.execute(
+                f'''SELECT device, inode, size, mtime, partial_hash, content_hash FROM files
+                     WHERE inode IN ({placeholders}) AND partial_hash IS NOT NULL''', chunk):
+            if (device, inode, size, mtime) in keys:
+                found[(device, inode, size, mtime)] = (partial_hash, content_hash)
+    return found
+
+
+def store_file_hashes(rows):
+    """
+    Record hashes for many (file_path, file_extension, category, file_color, device, inode, size, mtime,
+    partial_hash, content_hash) rows in one transaction. Paths already stored keep their category and color.
+    device and inode are None where the filesystem has no stable file ids, so those hashes are never looked up.
+    """
+    with get_database_connection() as conn:
+        conn.executemany('''INSERT INTO files (file_path, file_extension, category, file_color,
+                                               device, inode, size, mtime, partial_hash, content_hash)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                            ON CONFLICT(file_path) DO UPDATE SET device = excluded.device, inode = excluded.inode,
+                                size = excluded.size, mtime = excluded.mtime, partial_hash = excluded.partial_hash,
+                                content_hash = excluded.content_hash''',
+                         [(normalize_path(row[0]), *row[1:]) for row in rows])
+
+
+def lookup_transcripts(recognizer, content_hashes):
+    """Return {content_hash: transcript} for hashes already transcribed by recognizer."""
+    content_hashes = list(content_hashes)
+    found = {}
+    conn = get_database_connection()
+    for start in range(0, len(content_hashes), LOOKUP_CHUNK_SIZE):
+        chunk = content_hashes[start:start + LOOKUP_CHUNK_SIZE]
+        placeholders = ', '.join('?' * len(chunk))
+        found.update(conn.execute(f'''SELECT content_hash, transcript FROM transcripts
+                                      WHERE recognizer = ? AND content_hash IN ({placeholders})''',
+                                  [recognizer, *chunk]))
+    return found
+
+
+def store_transcripts(recognizer, rows):
+    """Record many (file_path, content_hash, transcript) rows made by recognizer in one transaction."""
+    now = time.time()
+    with get_database_connection() as conn:
+        conn.executemany('''INSERT INTO transcripts (content_hash, recognizer, file_path, transcript, created_at)
+                            VALUES (?, ?, ?, ?, ?)
+                            ON CONFLICT(content_hash, recognizer) DO UPDATE SET file_path = excluded.file_path,
+                                transcript = excluded.transcript, created_at = excluded.created_at''',
+                         [(content_hash, recognizer, normalize_path(file_path), transcript, now)
+                          for file_path, content_hash, transcript in rows])
+
+
+def get_transcript(file_path):
+    """The most recent transcript stored for file_path, or None."""
+    conn = get_database_connection()
+    row = conn.execute('''SELECT transcript FROM transcripts WHERE file_path = ?
+                          ORDER BY created_at DESC LIMIT 1''', (normalize_path(file_path),)).fetchone()
+    return row[0] if row else None
@@ -1,18 +1,30 @@
 import sys
 import os
 
-from PySide6.QtCore import qVersion, Qt
-from PySide6.QtWidgets import QApplication
-from PySide6.QtGui import QIcon
-
-from ui.fileexplorer import FileExplorer
-
-from backend.os_detection import detect_os
-
 # Add the 'src' directory (parent of this file) to the Python path
 sys.path.append(os.path.abspath(os.path.dirname(__file__)))
 
+PROFILE_FLAG = "--profile-startup"
+
 if __name__ == "__main__":
+    # Installed before anything heavy is imported, so the report covers Qt and the UI modules too
+    profiler = None
+    if PROFILE_FLAG in sys.argv:
+        sys.argv.remove(PROFILE_FLAG)
+        from backend.startup_profiler import StartupProfiler
+        profiler = StartupProfiler().install()
+
+    from PySide6.QtCore import qVersion, Qt
+    from PySide6.QtWidgets import QApplication
+    from PySide6.QtGui import QIcon
+
+    from ui.fileexplorer import FileExplorer
+
+    from backend.os_detection import detect_os
+
+    if profiler:
+        profiler.mark("imports done")
+
     app = QApplication(sys.argv)
     app.setOrganizationName("Smart Sort")
     app.setApplicationName("Smart Sort")
@@ -21,6 +33,15 @@ if __name__ == "__main__":
     app.setApplicationVersion(qVersion())
 
     fileExplorer = FileExplorer()
+    if profiler:
+        profiler.mark("window created")
+
+        def report_first_frame():
+            profiler.mark("first frame painted")
+            profiler.uninstall()
+            profiler.report()
+
+        fileExplorer.first_frame.connect(report_first_frame)
 
     # For starting maximized
     fileExplorer.showMaximized()
@@ -33,4 +54,4 @@ if __name__ == "__main__":
     os_type = detect_os()
     print(f"Operating System Detected: {os_type}")
 
-    sys.exit(app.exec())
\ No newline at end of file
+    sys.exit(app.exec())
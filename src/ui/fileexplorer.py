@@ -1,49 +1,205 @@
 import sys
 import os
+import threading
+import time
+from collections import OrderedDict
 from operator import contains
 
 from PySide6 import QtGui, QtWidgets
-from PySide6.QtCore import QSize, Qt, QDir, QTimer
-import qtawesome as qta
+from PySide6.QtCore import QSize, Qt, QDir, QModelIndex, QTimer, QObject, QRunnable, QThreadPool, Signal
 from PySide6.QtGui import QStandardItemModel, QStandardItem
 from PySide6.QtWidgets import (
     QMainWindow, QVBoxLayout, QWidget, QTreeView, QListView,
-    QFileSystemModel, QHBoxLayout, QSplitter, QPushButton, QStyledItemDelegate, QLineEdit
+    QFileSystemModel, QHBoxLayout, QSplitter, QPushButton, QStyledItemDelegate, QLineEdit, QLabel
 )
 
-from src.backend.file_search import search_files
-from src.io.manual_organization_script import Organize, get_category_colors
-from src.io.processed_data import lookup_files_by_file_path
+from src.backend.category_rules import get_rules
+from src.io.processed_data import lookup_files_in_directory, move_file_path
+
+# qtawesome, the search index, the watcher and the organizer are imported on first use rather than here,
+# so the window can paint before any of them (or the DB) is initialized; see FileExplorer.finish_startup
+
+# Search results are streamed to the GUI in batches of this many rows, or sooner if a batch is slow to fill
+SEARCH_BATCH_SIZE = 250
+SEARCH_BATCH_INTERVAL = 0.05
+
+
+class SearchSignals(QObject):
+    results_found = Signal(int, list)  # generation, paths
+    finished = Signal(int, int)  # generation, total results
+
+
+class WatcherSignals(QObject):
+    files_changed = Signal(list)  # coalesced FileEvents from the watcher thread
+
+
+class SearchWorker(QRunnable):
+    """Runs search_files on the thread pool and streams the paths back through SearchSignals."""
+
+    def __init__(self, query, generation, signals):
+        super().__init__()
+        self.query = query
+        self.generation = generation
+        self.signals = signals
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def run(self):
+        from src.backend.file_search import search_files
+
+        batch = []
+        total = 0
+        last_emit = time.monotonic()
+        try:
+            for file_path in search_files(self.query):
+                if self.cancelled.is_set():
+                    return
+                batch.append(file_path)
+                now = time.monotonic()
+                if len(batch) >= SEARCH_BATCH_SIZE or now - last_emit >= SEARCH_BATCH_INTERVAL:
+                    total += len(batch)
+                    self.signals.results_found.emit(self.generation, batch)
+                    batch = []
+                    last_emit = now
+            if batch and not self.cancelled.is_set():
+                total += len(batch)
+                self.signals.results_found.emit(self.generation, batch)
+        except Exception as e:
+            print(f"Error searching files: {e}")
+        if not self.cancelled.is_set():
+            self.signals.finished.emit(self.generation, total)
+
+
+# Glyph drawn for each category; anything not listed uses fa.file
+CATEGORY_GLYPHS = {'image': 'fa.image', 'video': 'fa.video-camera'}
+
+# Glyphs drawn by CustomFileSystemModel, pre-tinted at startup for every category color
+MODEL_ICON_GLYPHS = ['fa.folder', 'fa.image', 'fa.video-camera', 'fa.file']
+
+
+class TintedIconCache:
+    """
+    Bounded LRU cache of tinted QIcons keyed by (glyph, color, size).
+    hits and misses count lookups so we can check scrolling no longer renders icons.
+    """
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self.icons = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, glyph, color, size=64):
+        key = (glyph, color, size)
+        icon = self.icons.get(key)
+        if icon is not None:
+            self.hits += 1
+            self.icons.move_to_end(key)
+            return icon
+
+        self.misses += 1
+        icon = self.render(glyph, color, size)
+        self.icons[key] = icon
+        if len(self.icons) > self.max_size:
+            self.icons.popitem(last=False)
+        return icon
+
+    def warm(self, glyphs, colors, size=64):
+        for glyph in glyphs:
+            for color in colors:
+                key = (glyph, color, size)
+                if key not in self.icons:
+                    self.icons[key] = self.render(glyph, color, size)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.icons)}
+
+    @staticmethod
+    def render(glyph, color, size):
+        import qtawesome as qta
+        pixmap = qta.icon(glyph).pixmap(size, size)
+        colored_pixmap = pixmap.copy()
+        painter = QtGui.QPainter(colored_pixmap)
+        painter.setCompositionMode(QtGui.QPainter.CompositionMode_SourceIn)
+        painter.fillRect(colored_pixmap.rect(), QtGui.QColor(color))
+        painter.end()
+        return QtGui.QIcon(colored_pixmap)
 
 
 class CustomFileSystemModel(QFileSystemModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rules = get_rules()
+        self.icon_cache = TintedIconCache()
+
+        # Until enable_metadata runs (after the first frame) items get Qt's stock icons and the DB isn't touched
+        self.metadata_enabled = False
+
+        # directory -> {file_path: (category, file_color)}, filled with one DB query per directory
+        self.metadata_cache = {}
+        self.directoryLoaded.connect(self.load_directory_metadata)
+
+    def enable_metadata(self):
+        """Warms the tinted icons, opens the DB and repaints the views with category colors."""
+        palette = set(self.rules.colors.values()) | {'blue'}
+        self.icon_cache.warm(MODEL_ICON_GLYPHS, sorted(palette))
+        self.metadata_enabled = True
+
+        # Only the icons change, so tell views and proxies about the decoration of every row loaded so far
+        parents = [QModelIndex()]
+        while parents:
+            parent = parents.pop()
+            rows = self.rowCount(parent)
+            if rows == 0:
+                continue
+            self.dataChanged.emit(self.index(0, 0, parent), self.index(rows - 1, 0, parent), [Qt.DecorationRole])
+            parents.extend(self.index(row, 0, parent) for row in range(rows))
+
+    def load_directory_metadata(self, directory):
+        if not self.metadata_enabled:
+            return {}
+        directory = os.path.normpath(directory)
+        entries = lookup_files_in_directory(directory)
+        self.metadata_cache[directory] = entries
+        return entries
+
+    def file_metadata(self, path):
+        """Return (category, file_color) for path from the per-directory cache, or None if it isn't in the DB."""
+        path = os.path.normpath(path)
+        directory = os.path.dirname(path)
+        entries = self.metadata_cache.get(directory)
+        if entries is None:
+            entries = self.load_directory_metadata(directory)
+        return entries.get(path)
+
+    def invalidate_metadata(self, path):
+        """Drop cached metadata for the directory containing path and for everything below path."""
+        path = os.path.normpath(path)
+        prefix = path.rstrip(os.sep) + os.sep
+        self.metadata_cache.pop(os.path.dirname(path), None)
+        for directory in list(self.metadata_cache):
+            if directory == path or directory.startswith(prefix):
+                del self.metadata_cache[directory]
+
     def data(self, index, role=Qt.DisplayRole):
-        if role == Qt.DecorationRole:
-            icon = super().data(index, role)
+        if role == Qt.DecorationRole and self.metadata_enabled:
             path = self.filePath(index)
-            file_data = lookup_files_by_file_path(path)
-
-            if file_data:
-                file_color = file_data[0]["file_color"]
-            else:
-                file_color = None
 
             if self.isDir(index):
                 folder_name = os.path.basename(path)
                 folder_type = 'document' if folder_name == 'Documents' else folder_name.lower()
-                file_color = get_category_colors().get(folder_type, 'blue')  # Default to blue if not found
-                return self.color_icon(qta.icon('fa.folder'), file_color)
-
-            # Handle file types as before...
-            file_extension = os.path.splitext(path)[1][1:]  # Get the extension
-            if file_extension in ['jpg', 'jpeg', 'png', 'gif']:
-                return self.color_icon(qta.icon('fa.image'), file_color or 'orange')
-            elif file_extension in ['mp4', 'mkv']:
-                return self.color_icon(qta.icon('fa.video-camera'), file_color or 'red')
-            elif file_extension in ['pdf', 'docx', 'txt']:
-                return self.color_icon(qta.icon('fa.file'), file_color or 'green')
-            else:
-                return self.color_icon(qta.icon('fa.file'), file_color or 'gray')
+                file_color = self.rules.colors.get(folder_type, 'blue')  # Default to blue if not found
+                return self.color_icon('fa.folder', file_color)
+
+            metadata = self.file_metadata(path)
+            file_color = metadata[1] if metadata else None
+
+            # Files not in the DB are colored by the shared category rules
+            category = self.rules.categorize(os.path.basename(path))
+            glyph = CATEGORY_GLYPHS.get(category, 'fa.file')
+            return self.color_icon(glyph, file_color or self.rules.get_color(category))
 
         return super().data(index, role)
 
@@ -69,14 +225,8 @@ class CustomFileSystemModel(QFileSystemModel):
         """Refresh the model to reflect the changes."""
         self.setRootPath(self.rootPath())  # Reset the root path
 
-    def color_icon(self, icon, color):
-        pixmap = icon.pixmap(64, 64)  # Increase size to 64x64
-        colored_pixmap = pixmap.copy()
-        painter = QtGui.QPainter(colored_pixmap)
-        painter.setCompositionMode(QtGui.QPainter.CompositionMode_SourceIn)
-        painter.fillRect(colored_pixmap.rect(), QtGui.QColor(color))
-        painter.end()
-        return QtGui.QIcon(colored_pixmap)
+    def color_icon(self, glyph, color, size=64):
+        return self.icon_cache.get(glyph, color, size)
 
 class CustomDelegate(QStyledItemDelegate):
     def __init__(self, icon_size, parent=None):
@@ -95,6 +245,8 @@ class CustomDelegate(QStyledItemDelegate):
             icon.paint(painter, rect, Qt.AlignCenter)
 
 class FileExplorer(QMainWindow):
+    first_frame = Signal()
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Smart Sort File Explorer")
@@ -130,7 +282,7 @@ class FileExplorer(QMainWindow):
 
         # Back button with Font Awesome icon
         self.back_button = QPushButton()
-        self.back_button.setIcon(qta.icon('fa.arrow-left'))  # Use Font Awesome left arrow icon
+        self.back_button.setText("Back")  # Swapped for a Font Awesome arrow in finish_startup
         self.back_button.setToolTip("Go back")
         self.back_button.setEnabled(False)  # Initially disabled
         self.back_button.clicked.connect(self.go_back)
@@ -160,9 +312,22 @@ class FileExplorer(QMainWindow):
         self.search_bar.setPlaceholderText("Search...")
         self.search_bar.returnPressed.connect(self.filter_files)
 
+        # Live result count for the running search
+        self.search_status_label = QLabel()
+        self.search_status_label.hide()
+
+        # Searches run on a worker thread; a new search bumps the generation and cancels the old worker
+        self.search_signals = SearchSignals(self)
+        self.search_signals.results_found.connect(self.add_search_results)
+        self.search_signals.finished.connect(self.finish_search)
+        self.search_worker = None
+        self.search_generation = 0
+        self.search_result_count = 0
+
         # Add the button layout, search bar, and path line edit to the main layout
         layout.addLayout(button_layout)
         layout.addWidget(self.search_bar)
+        layout.addWidget(self.search_status_label)
         layout.addWidget(self.path_line_edit)
 
         # Add the splitter below the buttons and search bar
@@ -222,6 +387,45 @@ class FileExplorer(QMainWindow):
         # Connect the double-click signal to open files or directories
         self.list_view.doubleClicked.connect(self.open_item)
 
+        # Keep the search index and DB in sync with the watched folders (Downloads by default)
+        # Its events arrive on the watcher thread, so they reach the model through a queued signal
+        self.watcher_signals = WatcherSignals(self)
+        self.watcher_signals.files_changed.connect(self.on_files_changed)
+        self.file_watcher = None
+
+        # Everything not needed for the first frame is set up once it has been painted
+        self.startup_finished = False
+        self.first_frame.connect(lambda: QTimer.singleShot(0, self.finish_startup))
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.startup_finished:
+            self.startup_finished = True
+            self.first_frame.emit()
+
+    def finish_startup(self):
+        import qtawesome as qta
+        from src.backend.file_watcher import FileWatcher
+
+        self.back_button.setText("")
+        self.back_button.setIcon(qta.icon('fa.arrow-left'))  # Use Font Awesome left arrow icon
+        self.model.enable_metadata()
+
+        self.file_watcher = FileWatcher(on_events=self.watcher_signals.files_changed.emit)
+        self.file_watcher.start()
+
+    def on_files_changed(self, events):
+        for event in events:
+            self.model.invalidate_metadata(event.path)
+            if event.src_path:
+                self.model.invalidate_metadata(event.src_path)
+
+    def closeEvent(self, event):
+        self.cancel_search()
+        if self.file_watcher is not None:
+            self.file_watcher.stop()
+        super().closeEvent(event)
+
     def organize_folder(self):
         current_index = self.list_view.rootIndex()
         if current_index.isValid():
@@ -231,7 +435,9 @@ class FileExplorer(QMainWindow):
                 print(f"Error: The folder does not exist: {folder_path}")  # Debugging statement
                 return
             try:
+                from src.io.manual_organization_script import Organize
                 Organize(folder_path)
+                self.model.invalidate_metadata(folder_path)
                 self.model.refresh(current_index)  # Refresh the model to show updated organization
             except Exception as e:
                 print(f"Error organizing folder: {e}")
@@ -301,6 +507,8 @@ class FileExplorer(QMainWindow):
 
         try:
             os.rename(old_path, new_path)  # Rename the file
+            move_file_path(old_path, new_path)
+            self.model.invalidate_metadata(old_path)
             self.model.refresh(index.parent())  # Refresh the model to reflect changes
         except Exception as e:
             print(f"Error renaming file: {e}")
@@ -316,6 +524,8 @@ class FileExplorer(QMainWindow):
 
             try:
                 os.rename(old_path, new_path)  # Rename the file
+                move_file_path(old_path, new_path)
+                self.model.invalidate_metadata(old_path)
                 self.model.refresh(index.parent())  # Refresh the model to reflect changes
             except Exception as e:
                 print(f"Error renaming file: {e}")
@@ -376,21 +586,48 @@ class FileExplorer(QMainWindow):
     def filter_files(self):
         search_text = self.search_bar.text().lower()
 
+        self.cancel_search()
         self.search_results_model.clear()
 
         if not search_text:
+            self.search_status_label.hide()
             self.list_view.setModel(self.model)
             self.list_view.setRootIndex(self.model.index(os.path.expanduser("~")))
             return
 
-        # Perform the search and populate the search results model
-        for file_path in search_files(search_text):
+        # Set the list view to display the search results while they stream in
+        self.list_view.setModel(self.search_results_model)
+        self.search_result_count = 0
+        self.search_status_label.setText("Searching...")
+        self.search_status_label.show()
+
+        self.search_generation += 1
+        self.search_worker = SearchWorker(search_text, self.search_generation, self.search_signals)
+        QThreadPool.globalInstance().start(self.search_worker)
+
+    def cancel_search(self):
+        if self.search_worker is not None:
+            self.search_worker.cancel()
+            self.search_worker = None
+
+    def add_search_results(self, generation, file_paths):
+        # Batches from a cancelled search can still be queued; drop them
+        if generation != self.search_generation:
+            return
+
+        for file_path in file_paths:
             item = QStandardItem(os.path.basename(file_path))
             item.setData(file_path)
             self.search_results_model.appendRow(item)
 
-        # Set the list view to display the search results
-        self.list_view.setModel(self.search_results_model)
+        self.search_result_count += len(file_paths)
+        self.search_status_label.setText(f"Searching... {self.search_result_count} results")
+
+    def finish_search(self, generation, total):
+        if generation != self.search_generation:
+            return
+        self.search_worker = None
+        self.search_status_label.setText(f"{total} results")
 
     def toggle_hidden_items(self, checked):
             if checked: